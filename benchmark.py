@@ -0,0 +1,191 @@
+"""Benchmarks the solver in process over the LPs of the test directories.
+
+Each LP is parsed and solved --repeat times, and the fastest time of each
+phase is kept: parsing, the crash basis, phase one (the auxiliary LP or
+the dual simplex method), phase two and the report. The pivots of each phase, the counters
+of the solver and the peak memory of one more traced run are recorded too.
+The results can be saved as JSON with --output, and compared with saved
+results with --compare, which flags the LPs that became slower than the
+threshold allows.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from fnmatch import fnmatch
+from contextlib import redirect_stdout
+
+from solver import ENGINES, RULES, read_input, solve_portfolio, solve_uncached
+
+# Test directories, next to this file whatever the working directory
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIES = ["data", "test_LPs_volume1", "test_LPs_volume2"]
+PHASES = ["parse", "crash", "phase_one", "phase_two", "report"]
+# Changes of the total time smaller than this many seconds are noise
+NOISE = 0.002
+
+
+def run_once(path, args):
+    """Parses and solves the LP in the file once. Returns the statistics
+    of the run, and everything the solver printed."""
+    stats = {}
+    output = io.StringIO()
+    with redirect_stdout(output):
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            objective, constraints, stages = read_input(f, args, path)
+        stats["parse_time"] = time.perf_counter() - start
+        solve = solve_portfolio if args.portfolio else solve_uncached
+        solve(objective, constraints, args, stages=stages, stats=stats)
+    return stats, output.getvalue()
+
+
+def peak_memory(path, args):
+    """Returns the peak memory in bytes allocated while parsing and
+    solving the LP in the file."""
+    tracemalloc.start()
+    try:
+        run_once(path, args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(path, args):
+    """Returns the results of the LP in the file, with the fastest time
+    of each phase over the repeated runs."""
+    runs = []
+    for _ in range(args.repeat):
+        stats, output = run_once(path, args)
+        runs.append(stats)
+    lines = output.split()
+    result = {"status": lines[0] if lines else ""}
+    expected = os.path.join(os.path.dirname(os.path.dirname(path)), "output", os.path.basename(path))
+    if os.path.exists(expected):
+        with open(expected) as f:
+            result["expected"] = f.read().split()[:2] == lines[:2]
+    for phase in PHASES:
+        result[phase + "_time"] = min(stats[phase + "_time"] for stats in runs)
+    result["total_time"] = sum(result[phase + "_time"] for phase in PHASES)
+    if args.portfolio:
+        result["winner"] = runs[-1].get("portfolio_winner")
+    for counter in ["crash_pivots", "phase_one_pivots", "phase_two_pivots", "pivots", "degenerate_pivots",
+                    "ratio_candidates", "denominator_bits"]:
+        result[counter] = runs[-1][counter]
+    if args.memory:
+        result["peak_memory"] = peak_memory(path, args)
+    return result
+
+
+def input_files(only):
+    """Yields the name and path of every LP in the test directories whose
+    file name, with or without its extension, matches one of the patterns,
+    or every LP if there are none."""
+    for directory in DIRECTORIES:
+        inputs = os.path.join(ROOT, directory, "input")
+        for filename in sorted(os.listdir(inputs)):
+            names = [filename, os.path.splitext(filename)[0]]
+            if not only or any(fnmatch(name, pattern) for name in names for pattern in only):
+                yield f"{directory}/{filename}", os.path.join(inputs, filename)
+
+
+def total_pivots(result):
+    """Returns the pivots of every phase of the results of an LP."""
+    return sum(result.get(phase + "_pivots", 0) for phase in ["crash", "phase_one", "phase_two"])
+
+
+def compare(results, baseline, threshold):
+    """Prints the LPs whose status changed from the baseline, or whose
+    total time changed by more than the threshold fraction, or whose
+    number of pivots changed. Returns the number of regressions."""
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        if result["status"] != old["status"]:
+            print(f"CHANGED    {name}: {old['status']} -> {result['status']}")
+            regressions += 1
+            continue
+        pivots = total_pivots(result)
+        old_pivots = total_pivots(old)
+        if pivots != old_pivots:
+            print(f"pivots     {name}: {old_pivots} -> {pivots}")
+        ratio = result["total_time"] / max(old["total_time"], 1e-9)
+        if abs(result["total_time"] - old["total_time"]) < NOISE:
+            continue
+        if ratio > 1 + threshold:
+            print(f"REGRESSION {name}: {old['total_time']:.4g}s -> {result['total_time']:.4g}s ({ratio:.2f}x)")
+            regressions += 1
+        elif ratio < 1 / (1 + threshold):
+            print(f"improved   {name}: {old['total_time']:.4g}s -> {result['total_time']:.4g}s ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmarks the solver over the LPs of the test directories.")
+    parser.add_argument("only", nargs="*",
+                        help="only benchmark the LPs whose file name, with or without .txt, matches one "
+                             "of these patterns, such as optimal_3x3_1 or 'netlib_*'")
+    parser.add_argument("--engine", choices=ENGINES.keys(), default="dictionary",
+                        help="representation of the dictionary used while pivoting")
+    parser.add_argument("--rule", choices=RULES["dictionary"].keys(), default="bland",
+                        help="pivot rule choosing the entering variable")
+    parser.add_argument("--crossover", action="store_true",
+                        help="move the solution of the interior engine to an optimal vertex")
+    parser.add_argument("--crash", action="store_true",
+                        help="start from a triangular crash basis instead of the slack variables")
+    parser.add_argument("--portfolio", metavar="CONFIGS",
+                        help="race these comma separated configurations, each engine[:rule[:crash]], "
+                             "instead of --engine, --rule and --crash")
+    parser.add_argument("--presolve", action="store_true",
+                        help="remove redundant rows and columns before solving")
+    parser.add_argument("--scaling", choices=["geometric", "equilibrate"],
+                        help="scale the rows and columns of the LP before solving")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of timed runs of each LP, the fastest is kept (default: 3)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="do not measure the peak memory, which takes one more run")
+    parser.add_argument("--output", metavar="FILE",
+                        help="save the results to this file as JSON")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the results with those saved in this file by --output")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fraction by which the time of an LP may grow before it is flagged "
+                             "as a regression (default: 0.1)")
+    args = parser.parse_args()
+    # The options of the solver which the benchmark does not change
+    args.format, args.sensitivity, args.convert, args.trace = "auto", False, None, None
+
+    results = {}
+    print(f"{'LP':<45} {'status':<10} {'parse':>8} {'crash':>8} {'phase 1':>8} {'phase 2':>8} {'report':>8} "
+          f"{'pivots':>7} {'memory':>9}")
+    for name, path in input_files(args.only):
+        result = benchmark(path, args)
+        results[name] = result
+        pivots = total_pivots(result)
+        memory = f"{result['peak_memory'] / 1024:.0f}K" if args.memory else "-"
+        mark = "" if result.get("expected", True) else " (differs from expected output)"
+        if args.portfolio:
+            mark = f" {result['winner']}{mark}"
+        print(f"{name:<45} {result['status']:<10} "
+              + " ".join(f"{result[phase + '_time']:>8.4f}" for phase in PHASES)
+              + f" {pivots:>7} {memory:>9}{mark}", flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"engine": args.engine, "rule": args.rule, "crash": args.crash, "portfolio": args.portfolio,
+                       "presolve": args.presolve, "scaling": args.scaling, "results": results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
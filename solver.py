@@ -10,12 +10,38 @@
 # overhead which increases the runtime of large LPs.
 
 
+import io
+import os
+import json
+import hashlib
+import heapq
 import sys
+import time
+import argparse
+import multiprocessing
+import queue
+import warnings
+from contextlib import redirect_stdout
 from enum import Enum
+from collections import OrderedDict, defaultdict
 from fractions import Fraction
+from math import inf, lcm, log2
 # from variable import DictionaryVariable as Variable, VarType
 # from equation import Constraint, Objective
-from copy import deepcopy
+from copy import copy
+
+# NumPy is optional; only the array based engines need it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# SciPy is optional too; the array based engines factorize and solve
+# with its LAPACK routines if it is installed
+try:
+    import scipy.linalg
+except ImportError:
+    scipy = None
 
 
 class VarType(Enum):
@@ -27,13 +53,22 @@ class Variable:
     """Represents a variable in either a constraint or objective function
     of the SimplexDictionary. Stores the variable type (optimization,
     slack, omega is represented as an optimization variable with index n+1).
-    As well as the index and coefficient. Some boilerplate is defined for
-    comparison operations."""
+    As well as the index and coefficient, and the integer id of the variable,
+    which orders x < omega < w numerically (x_j is j-1, omega is n and w_i
+    is n+i). Some boilerplate is defined for comparison operations.
+
+    A variable may also have an upper bound. While it is complemented, the
+    dictionary holds its upper bound minus its value in its place, so that
+    a nonbasic variable is always 0 whichever bound it sits at."""
+
+    upper = inf
+    complemented = False
 
-    def __init__(self, vartype, index, coef):
+    def __init__(self, vartype, index, coef, var_id=None):
         self.vartype = vartype
         self.index = index
         self.coef = coef
+        self.id = var_id
         if vartype is VarType.optimization:
             self.name = f"x_{self.index}"
         elif vartype is VarType.slack:
@@ -85,47 +120,35 @@ class Equation:
     """Serves as a base class for a Constraint or Objective
     function of the SimplexDictionary. Stores the scalar, nonbasic
     variables, and provides a method for redefining terms
-    within the equation in terms of another."""
+    within the equation in terms of another. Every equation of a
+    dictionary lists the same nonbasic variables in the same order,
+    so a column index refers to the same variable in all of them."""
 
     def __init__(self, nonbasic):
         self.scalar = 0
         self.nonbasic = nonbasic
-        self._sort()
 
-    def redefine_term(self, expression):
+    def duplicate(self):
+        """Returns a copy of the equation which can be changed without
+        changing this one. Only the variables need to be copied, as the
+        coefficients they hold are immutable."""
+        equation = copy(self)
+        equation.nonbasic = [copy(var) for var in self.nonbasic]
+        return equation
+
+    def redefine_term(self, expression, column):
         """Redefine the equation in terms of another expression
-        (another constraint equation)."""
-        multiplier = 0
-        temp = []
-        for var in self.nonbasic:
-            if var.name == expression.basic.name:
-                multiplier = var.coef
-                self.nonbasic.remove(var)
-                break
+        (another constraint equation), which has just been rearranged
+        in terms of the variable at the given column. That column now
+        holds the old basic variable of the expression."""
+        multiplier = self.nonbasic[column].coef
+        self.nonbasic[column] = copy(expression.nonbasic[column])
+        self.nonbasic[column].coef = 0
+        if multiplier == 0:
+            return
         self.scalar += expression.scalar*multiplier
-        for new in expression.nonbasic:
-            found = False
-            for v in self.nonbasic:
-                if v.name == new.name:
-                    found = True
-                    v.coef += new.coef*multiplier
-                    break
-            if not found:
-                copy_variable = deepcopy(new)
-                copy_variable.coef *= multiplier
-                temp.append(copy_variable)
-        self.nonbasic.extend(temp)
-        self._sort()
-
-    def _sort(self):
-        """Ensure that nonbasic variables are always listed in order of index.
-        With optimization variables coming before slack variables always."""
-        temp_opt = [v for v in self.nonbasic if v.vartype is VarType.optimization]
-        temp_slack = [v for v in self.nonbasic if v.vartype is VarType.slack]
-        temp_opt.sort()
-        temp_slack.sort()
-        temp_opt.extend(temp_slack)
-        self.nonbasic = temp_opt
+        for var, new in zip(self.nonbasic, expression.nonbasic):
+            var.coef += new.coef*multiplier
 
 
 class Objective(Equation):
@@ -153,27 +176,27 @@ class Constraint(Equation):
         self.scalar = basic.coef
         self.basic = basic
         self.basic.coef = 1
-        self._sort()
-    
-    def rearrange_in_terms_of(self, varname):
-        """Rearrange the equation so that variables represented
-        by varname is the new dependent variable.
-        :param: varname """
+
+    def duplicate(self):
+        constraint = super().duplicate()
+        constraint.basic = copy(self.basic)
+        return constraint
+
+    def rearrange_in_terms_of(self, column):
+        """Rearrange the equation so that the variable at the given
+        column is the new dependent variable. The old basic variable
+        takes its place in that column.
+        :param: column """
         temp = self.basic
-        for var in self.nonbasic:
-            if var.name == varname:
-                self.basic = var
-                self.nonbasic.remove(self.basic)
-                self.basic.coef *= -1
-                break
+        self.basic = self.nonbasic[column]
+        self.basic.coef *= -1
         temp.coef *= -1
-        self.nonbasic.append(temp)
+        self.nonbasic[column] = temp
         divisor = self.basic.coef
         self.basic.coef = 1
         for var in self.nonbasic:
             var.coef /= divisor
         self.scalar /= divisor
-        self._sort()
 
     def __repr__(self):
         r = f"{self.basic.coef}{self.basic.name} = {self.scalar} "
@@ -185,120 +208,547 @@ class Constraint(Equation):
         return r
 
 
+def ratio_limit(constraints, entering_index):
+    """Returns how far the entering variable at entering_index can grow,
+    and the variable which limits it: the basic variable of the
+    constraint with the minimum ratio, with ids breaking ties (x < omega
+    < w). A basic variable with an upper bound also limits it if it grows
+    with the entering variable, and the entering variable itself does if
+    it reaches its own upper bound first. Returns None and None if nothing
+    limits it."""
+    min_ratio = leaving = None
+    for con in constraints:
+        coef = con.nonbasic[entering_index].coef
+        if coef < 0:
+            ratio = abs(con.scalar / coef)
+        elif coef > 0 and con.basic.upper != inf:
+            ratio = (con.basic.upper - con.scalar) / coef
+        else:
+            continue
+        # If it is equal, the lowest id wins
+        if min_ratio is None or ratio < min_ratio or \
+                (ratio == min_ratio and con.basic.id < leaving.id):
+            min_ratio = ratio
+            leaving = con.basic
+    if constraints:
+        entering = constraints[0].nonbasic[entering_index]
+        if entering.upper != inf and (min_ratio is None or entering.upper <= min_ratio):
+            min_ratio, leaving = entering.upper, entering
+    return min_ratio, leaving
+
+
+def ratio_test(constraints, entering_index):
+    """Returns the name of the leaving variable for the entering
+    variable at entering_index, as chosen by ratio_limit(). That is the
+    name of the entering variable itself if it only moves to its upper
+    bound (a bound flip), and None if it can grow without bound."""
+    leaving = ratio_limit(constraints, entering_index)[1]
+    return leaving.name if leaving is not None else None
+
+
 def blands_rule(objective, constraints):
     """Returns the name of the chosen entering and
-    leaving variables, chosen using Bland's Rule."""
+    leaving variables, chosen using Bland's Rule. The entering variable
+    is None if the dictionary is optimal, and the leaving variable is
+    None if the entering variable can be increased without bound, so
+    one call is all run() needs for each iteration. The other rules
+    return the same."""
 
-    # Find entering variable (first pos coefficient)
+    # Find entering variable (lowest id with a pos coefficient)
     entering_index = None
     for i, var in enumerate(objective.nonbasic):
         if var.coef > 0:
-            entering = var.name
-            entering_index = i
-            break
-    
+            if entering_index is None or var.id < objective.nonbasic[entering_index].id:
+                entering_index = i
+    if entering_index is None:
+        return None, None
+    entering = objective.nonbasic[entering_index].name
+
     # Find leaving variable (minimum c/m coefficient) with
-    # indices breaking ties and x < omega < w
-    min_ratio = None
-    for con in constraints:
-        if con.nonbasic[entering_index].coef < 0:
-            ratio = abs(con.scalar / con.nonbasic[entering_index].coef)
-            if min_ratio is None:
-                min_ratio = ratio
-                leaving = con.basic.name
-            # If new ratio is less, it is obv the min
-            if ratio < min_ratio:
+    # ids breaking ties and x < omega < w
+    leaving = ratio_test(constraints, entering_index)
+    return entering, leaving
+
+
+def dantzigs_rule(objective, constraints):
+    """Returns the name of the chosen entering and leaving variables,
+    chosen using the largest coefficient rule."""
+    entering_index = None
+    for i, var in enumerate(objective.nonbasic):
+        if var.coef > 0:
+            best = objective.nonbasic[entering_index] if entering_index is not None else None
+            if best is None or (var.coef, -var.id) > (best.coef, -best.id):
+                entering_index = i
+    if entering_index is None:
+        return None, None
+    entering = objective.nonbasic[entering_index].name
+    return entering, ratio_test(constraints, entering_index)
+
+
+def largest_increase_rule(objective, constraints):
+    """Returns the name of the chosen entering and leaving variables,
+    choosing the entering variable which increases the objective
+    function the most once the ratio test has bounded it."""
+    best = None
+    for i, var in enumerate(objective.nonbasic):
+        if var.coef > 0:
+            bound = ratio_limit(constraints, i)[0]
+            if bound is None:
+                return var.name, None
+            if best is None or var.coef*bound > best:
+                best = var.coef*bound
+                entering_index = i
+    if best is None:
+        return None, None
+    entering = objective.nonbasic[entering_index].name
+    return entering, ratio_test(constraints, entering_index)
+
+
+def steepest_edge_rule(objective, constraints):
+    """Returns the name of the chosen entering and leaving variables,
+    choosing the entering variable whose edge of the feasible region
+    makes the smallest angle with the objective function. The norms of
+    the edges are computed exactly from the dictionary, in floats as
+    they only steer the choice."""
+    best = None
+    for i, var in enumerate(objective.nonbasic):
+        if var.coef > 0:
+            norm = 1 + sum(float(con.nonbasic[i].coef)**2 for con in constraints)
+            score = float(var.coef)**2 / norm
+            if best is None or score > best:
+                best = score
+                entering_index = i
+    if best is None:
+        return None, None
+    entering = objective.nonbasic[entering_index].name
+    return entering, ratio_test(constraints, entering_index)
+
+
+class DevexRule:
+    """Chooses the entering variable like steepest_edge_rule, but with
+    Devex reference weights that approximate the norms of the edges and
+    are updated from the pivot row alone. The weights are kept between
+    calls, so a new instance is needed for every LP."""
+
+    def __init__(self):
+        self.weights = {}
+
+    def __call__(self, objective, constraints):
+        best = None
+        for i, var in enumerate(objective.nonbasic):
+            if var.coef > 0:
+                score = float(var.coef)**2 / self.weights.get(var.name, 1)
+                if best is None or score > best:
+                    best = score
+                    entering_index = i
+        if best is None:
+            return None, None
+        entering = objective.nonbasic[entering_index].name
+        leaving = ratio_test(constraints, entering_index)
+        # Update the weights from the pivot row
+        for con in constraints:
+            if con.basic.name == leaving:
+                pivot = float(con.nonbasic[entering_index].coef)
+                weight = self.weights.get(entering, 1)
+                for var in con.nonbasic:
+                    if var.name != entering:
+                        ratio = float(var.coef) / pivot
+                        self.weights[var.name] = max(self.weights.get(var.name, 1), ratio**2 * weight)
+                self.weights[leaving] = max(weight / pivot**2, 1)
+                break
+        return entering, leaving
+
+
+class PartialPricingRule:
+    """Chooses the entering variable with partial and multiple pricing.
+    Only one segment of the objective function is priced at a time,
+    starting where the previous search stopped, and the best few
+    candidates found there are remembered. Following iterations only
+    re-price those candidates, until none of them is attractive and
+    the next segment is priced."""
+
+    def __init__(self, segments=4, candidates=4):
+        self.segments = segments
+        self.max_candidates = candidates
+        self.candidates = []
+        self.start = 0
+
+    def __call__(self, objective, constraints):
+        positions = {var.name: i for i, var in enumerate(objective.nonbasic)}
+        # Re-price the remembered candidates first
+        self.candidates = [name for name in self.candidates
+                           if name in positions and objective.nonbasic[positions[name]].coef > 0]
+        if not self.candidates:
+            k = len(objective.nonbasic)
+            size = -(-k // self.segments)
+            for _ in range(self.segments):
+                segment = [(k+self.start+j) % k for j in range(min(size, k))]
+                self.start = (self.start + size) % k
+                improving = [i for i in segment if objective.nonbasic[i].coef > 0]
+                if improving:
+                    improving.sort(key=lambda i: objective.nonbasic[i].coef, reverse=True)
+                    self.candidates = [objective.nonbasic[i].name for i in improving[:self.max_candidates]]
+                    break
+            else:
+                return None, None
+        entering = max(self.candidates, key=lambda name: objective.nonbasic[positions[name]].coef)
+        self.candidates.remove(entering)
+        return entering, ratio_test(constraints, positions[entering])
+
+
+def dual_blands_rule(objective, constraints):
+    """Returns the names of the entering and leaving variables of a
+    dual simplex pivot, chosen using Bland's Rule. The leaving variable
+    is the lowest indexed basic variable with a negative value, and the
+    entering variable has the minimum ratio of objective coefficient to
+    coefficient in its row, with indices breaking ties. The entering
+    variable is None if that row proves the LP is infeasible."""
+    infeasible = [con for con in constraints if con.scalar < 0]
+    row = min(infeasible, key=lambda con: con.basic.id)
+    entering = None
+    for i, var in enumerate(row.nonbasic):
+        if var.coef > 0:
+            ratio = -objective.nonbasic[i].coef / var.coef
+            if entering is None or ratio < min_ratio or (ratio == min_ratio and var.id < entering.id):
                 min_ratio = ratio
-                leaving = con.basic.name
-            # If it is equal, need to compare indices of leaving vars
-            elif ratio == min_ratio:
-                challenger = con.basic.name 
-                champion = leaving 
-                if challenger.startswith('x') and champion.startswith('x'):
-                    chal = ''.join(c for c in challenger if c.isdigit())
-                    cham = ''.join(c for c in champion if c.isdigit())
-                    if chal < cham:
-                        leaving = challenger
-                    else:
-                        pass
-                elif challenger.startswith('x') and champion.startswith('w'):
-                    leaving = challenger
-                elif challenger.startswith('w') and champion.startswith('x'):
-                    pass
-                else: # challenger is w and champion is w
-                    chal = ''.join(c for c in challenger if c.isdigit())
-                    cham = ''.join(c for c in champion if c.isdigit())
-                    if chal < cham:
-                        leaving = challenger
-                    else:
-                        pass
+                entering = var
+    return (entering.name if entering is not None else None), row.basic.name
 
-    return entering, leaving
 
+class SparseRow:
+    """Stores a constraint as a dict from column to each nonzero
+    coefficient, and its bound. It reads like the list [a_1, ..., a_n, b]
+    of the text format, so every engine accepts it, while the sparse
+    engines only visit the nonzeros through row_items()."""
+
+    # Missing coefficients, as a Fraction so that exact engines stay exact
+    zero = Fraction(0)
+
+    def __init__(self, n, coefs, rhs):
+        self.n = n
+        self.coefs = coefs
+        self.rhs = rhs
+
+    def __len__(self):
+        return self.n + 1
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[k] for k in range(*key.indices(self.n+1))]
+        if key < 0:
+            key += self.n + 1
+        if not 0 <= key <= self.n:
+            raise IndexError("constraint index out of range")
+        return self.rhs if key == self.n else self.coefs.get(key, self.zero)
+
+
+def row_items(constraint):
+    """Returns the column and value of every nonzero coefficient of a
+    constraint, given as a list or a SparseRow."""
+    if isinstance(constraint, SparseRow):
+        return constraint.coefs.items()
+    return [(j, coef) for j, coef in enumerate(constraint[:-1]) if coef != 0]
+
+
+class SparseConstraints:
+    """Stores constraints in compressed sparse row (CSR) form, as arrays
+    which may be memory-mapped from a binary LP file. The coefficients of
+    row i are data[indptr[i]:indptr[i+1]], in the columns given by the
+    same slice of indices. Reads like a list of SparseRows, built when
+    accessed, while RevisedSimplex uses the arrays directly.
+
+    The rows hold floats, unless exact is True. Then they hold the
+    nearest simple Fractions to the floats, except for the exact values
+    which rationals gives by position in data and in rhs."""
+
+    def __init__(self, n, indptr, indices, data, rhs, rationals=None, exact=False):
+        self.n = n
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.rhs = rhs
+        self.rationals = rationals
+        self.exact = exact
+
+    def __len__(self):
+        return len(self.rhs)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("constraint index out of range")
+        start, end = self.indptr[i], self.indptr[i+1]
+        columns = self.indices[start:end].tolist()
+        if not self.exact:
+            values, rhs = self.data[start:end].tolist(), float(self.rhs[i])
+        else:
+            data, rhs = self.rationals or ({}, {})
+            values = [data[k] if k in data else Fraction(v).limit_denominator()
+                      for k, v in enumerate(self.data[start:end].tolist(), start)]
+            rhs = rhs[i] if i in rhs else Fraction(float(self.rhs[i])).limit_denominator()
+        return SparseRow(self.n, dict(zip(columns, values)), rhs)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class BoundedConstraints(list):
+    """A list of constraints whose variables may have upper bounds, given
+    in the upper dict by variable id: column k of the n columns is k, and
+    the slack of row i is n+1+i. An upper bound r on a slack makes a
+    ranged row b - r <= a x <= b. SimplexDictionary keeps the bounds as
+    they are, while expand() turns them into rows for the other engines."""
+
+    def __init__(self, rows, n, upper):
+        super().__init__(rows)
+        self.n = n
+        self.upper = upper
+
+    def expand(self):
+        """Returns the constraints as a plain list of rows, each ranged
+        row followed by the row -a x <= r - b, and a row x_k <= u at the
+        end for each bounded column."""
+        rows = []
+        for i, row in enumerate(self):
+            rows.append(row)
+            bound = self.upper.get(self.n+1+i)
+            if bound is not None:
+                rows.append(SparseRow(self.n, {j: -a for j, a in row_items(row)}, bound - row[-1]))
+        for k in sorted(k for k in self.upper if k < self.n):
+            bound = self.upper[k]
+            rows.append(SparseRow(self.n, {k: type(bound)(1)}, bound))
+        return rows
+
+
+# Number of degenerate pivots in a row after which the chosen
+# rule is assumed to be cycling and Bland's Rule takes over
+DEGENERATE_PIVOT_LIMIT = 50
+
+
+class BaseDictionary:
+    """Serves as a base class for every solver engine. Provides the
+    output formatting shared by all of them, so that each engine only
+    has to implement is_feasible(), is_unbounded(), is_optimal(),
+    objective_value() and coordinates()."""
+
+    # Largest auxiliary objective value still considered to be zero,
+    # and smallest change in the objective value counted as progress
+    tolerance = 0
+
+    # Number of pivots in a row which did not improve the objective
+    stalled = 0
+
+    # Counters of the work done by this dictionary and those it was copied
+    # from: pivots, pivots of the simplex method which did not improve the
+    # objective value, rows compared by primal ratio tests, the largest
+    # denominator, in bits, of a value computed by an exact pivot, and
+    # the bound flips which moved a variable between its bounds instead
+    pivots = 0
+    degenerate_pivots = 0
+    ratio_candidates = 0
+    denominator_bits = 0
+    bound_flips = 0
+
+    # Whether the engine keeps the upper bounds of read_text() as bounds,
+    # otherwise they are given to it as rows
+    supports_bounds = False
+
+    # Callbacks called after every pivot, see subscribe()
+    observers = ()
+
+    def select_rule(self):
+        """Returns the rule to use for the next pivot. This is the rule
+        the dictionary was created with, unless DEGENERATE_PIVOT_LIMIT
+        pivots in a row have not improved the objective, which could be
+        cycling. Then Bland's Rule is used until the objective improves,
+        which guarantees termination whatever the chosen rule."""
+        if self.stalled < DEGENERATE_PIVOT_LIMIT:
+            return self.rule
+        return self.fallback_rule
+
+    def select_dual_rule(self):
+        """Same as select_rule(), for the dual simplex method."""
+        if self.stalled < DEGENERATE_PIVOT_LIMIT:
+            return self.dual_rule
+        return self.dual_fallback_rule
+
+    def record_progress(self, before, dual=False):
+        """Updates the count of degenerate pivots, given the objective
+        value before the last pivot. The dual simplex method decreases
+        the objective value instead of increasing it."""
+        change = self.objective_value() - before
+        if (-change if dual else change) > self.tolerance:
+            self.stalled = 0
+        else:
+            self.stalled += 1
+            self.degenerate_pivots += 1
+
+    def record_pivot(self, entering, leaving, denominator=1):
+        """Counts a pivot of the variable with id entering into the basis
+        in place of the variable with id leaving, given the denominator of
+        a value it computed, and calls the subscribed callbacks. Engines
+        call it once the pivot is done."""
+        self.pivots += 1
+        bits = denominator.bit_length()
+        if bits > self.denominator_bits:
+            self.denominator_bits = bits
+        if self.observers:
+            value, elapsed = self.objective_value(), time.perf_counter() - self.started
+            for callback in self.observers:
+                callback(int(entering), int(leaving), value, elapsed)
+
+    def subscribe(self, callback):
+        """Calls callback(entering, leaving, objective, elapsed) after every
+        pivot of this dictionary and of the dictionaries copied from it
+        from now on, such as its auxiliary LP, with the ids of the entering
+        and leaving variables, the objective value after the pivot and the
+        seconds since the first callback was subscribed. Without callbacks
+        a pivot only updates the counters."""
+        if not self.observers:
+            self.started = time.perf_counter()
+        self.observers = self.observers + (callback,)
+
+    def counters(self):
+        """Returns the counters of the work done by this dictionary."""
+        return {"pivots": self.pivots, "degenerate_pivots": self.degenerate_pivots,
+                "ratio_candidates": self.ratio_candidates, "denominator_bits": self.denominator_bits,
+                "bound_flips": self.bound_flips}
+
+    def report(self):
+        """Generates an output string in accordance
+        with the project spec."""
+        # Format Output
+        if not self.is_feasible():
+            print("infeasible")
+        elif self.is_unbounded():
+            print("unbounded")
+        elif self.is_optimal():
+            print("optimal")
+            print(f"{float(self.objective_value()):.7g}")
+            coords = self.coordinates()
+            for i, c in enumerate(coords):
+                if i != len(coords)-1:
+                    print(f"{float(c[1]):.7g}", end=' ')
+                else:
+                    print(f"{float(c[1]):.7g}")
+        else:
+            # This should never happen
+            print("infeasible")
+
+
+class SimplexDictionary(BaseDictionary):
+    """The dictionary of the LP as Variable and Equation objects with
+    exact Fraction arithmetic. If the constraints have upper bounds, given
+    by variable id in their upper attribute as by read_text(), they stay
+    bounds of the variables rather than rows: the ratio test also stops at
+    them, and a variable which reaches its upper bound is complemented."""
+
+    supports_bounds = True
 
-class SimplexDictionary:
     def __init__(self, objective, constraints, rule):
         self.rule = rule
+        self.fallback_rule = blands_rule
+        self.dual_rule = dual_blands_rule
         self.obj = None
         self.con = []
         self.original_obj = None
+        self.unbounded = False
+        n = len(objective)
         # Convert objective coefficients to modelling of obj function
         temp = []
         for i, coef in enumerate(objective):
-            temp.append(Variable(VarType.optimization, i+1, coef))
+            temp.append(Variable(VarType.optimization, i+1, coef, i))
             self.obj = Objective(temp)
         # Convert constraint coefficients to modelling of dict rows
         for i, constraint in enumerate(constraints):
             temp = []
-            temp.append(Variable(VarType.slack, i+1, constraint[-1]))
-            temp.extend([Variable(VarType.optimization, j+1, coef*(-1)) for j, coef in enumerate(constraint[:-1])])
+            temp.append(Variable(VarType.slack, i+1, constraint[-1], n+1+i))
+            temp.extend([Variable(VarType.optimization, j+1, coef*(-1), j) for j, coef in enumerate(constraint[:-1])])
             self.con.append(Constraint(temp[0], temp[1:]))
         self.highest_index = self.obj.nonbasic[-1].index
         self.omega_index = self.highest_index + 1
+        self.bounded = bool(getattr(constraints, "upper", None))
+        if self.bounded:
+            for equation in [self.obj, *self.con]:
+                for var in [*equation.nonbasic, getattr(equation, "basic", None)]:
+                    if var is not None and var.id in constraints.upper:
+                        var.upper = constraints.upper[var.id]
+        self.index_positions()
+
+    def index_positions(self):
+        """Rebuilds the maps from variable id to the row of each basic
+        variable and to the column of each nonbasic variable, which
+        pivot() keeps up to date."""
+        size = self.omega_index + len(self.con)
+        self.row_of = [None]*size
+        self.column_of = [None]*size
+        for i, con in enumerate(self.con):
+            self.row_of[con.basic.id] = i
+        for j, var in enumerate(self.obj.nonbasic):
+            self.column_of[var.id] = j
 
     def get_auxiliary_lp(self):
-        auxiliary_lp = deepcopy(self)
-        auxiliary_lp.original_obj = deepcopy(self.obj)
+        """Returns a new SimplexDictionary object which represents
+        the auxiliary LP, after its initial pivot has been performed
+        to make it feasible. The original objective function is kept
+        as it is, and only the constraints are copied."""
+        auxiliary_lp = copy(self)
+        auxiliary_lp.original_obj = self.obj
+        auxiliary_lp.con = [constraint.duplicate() for constraint in self.con]
+        auxiliary_lp.row_of = list(self.row_of)
+        auxiliary_lp.column_of = list(self.column_of)
         # Replace objective function with just -omega
+        auxiliary_lp.obj = self.obj.duplicate()
         auxiliary_lp.obj.scalar = 0
         for var in auxiliary_lp.obj.nonbasic:
             var.coef = 0
-        auxiliary_lp.obj.nonbasic.append(Variable(VarType.optimization, self.omega_index, Fraction(-1, 1)))
-        # Add omega to each constraint
+        omega_id = self.highest_index
+        auxiliary_lp.obj.nonbasic.append(Variable(VarType.optimization, self.omega_index, Fraction(-1, 1), omega_id))
+        # Add omega to each constraint. Its initial pivot moves every basic
+        # variable up by the largest infeasibility, except that those which
+        # would pass their upper bound stop at it, or come down to it
+        infeasibility = max(map(self.infeasibility, self.con), default=0)
         for constraint in auxiliary_lp.con:
-            constraint.nonbasic.append(Variable(VarType.optimization, self.omega_index, Fraction(1,1)))
+            coef = Fraction(1,1)
+            if constraint.scalar + infeasibility > constraint.basic.upper:
+                coef = (constraint.basic.upper - constraint.scalar) / infeasibility
+            constraint.nonbasic.append(Variable(VarType.optimization, self.omega_index, coef, omega_id))
+        auxiliary_lp.column_of[omega_id] = len(auxiliary_lp.obj.nonbasic) - 1
         if not auxiliary_lp.is_feasible():
             leaving = self.least_feasible_constraint()
             entering = f"x_{self.omega_index}"
+            row = auxiliary_lp.con[auxiliary_lp.row_of[variable_id(leaving, self.highest_index)]]
+            if row.scalar > row.basic.upper:
+                # The leaving variable comes down to its upper bound
+                auxiliary_lp.complement(row.basic.id)
             auxiliary_lp.pivot(entering, leaving)
         return auxiliary_lp
 
+    @staticmethod
+    def infeasibility(constraint):
+        """Returns how far the basic variable of the constraint is below
+        zero or above its upper bound, which is negative if it is
+        between them."""
+        return max(-constraint.scalar, constraint.scalar - constraint.basic.upper)
+
     def least_feasible_constraint(self):
         """Returns the name of the basic variable in the least 
         feasible constraint."""
         least_feasible = self.con[0]
         for constraint in self.con:
-            if constraint.scalar < least_feasible.scalar:
+            if self.infeasibility(constraint) > self.infeasibility(least_feasible):
                 least_feasible = constraint
         return least_feasible.basic.name
 
     def is_feasible(self):
         for c in self.con:
-            if c.scalar < 0:
+            if c.scalar < 0 or c.scalar > c.basic.upper:
                 return False
         return True
 
     def is_unbounded(self):
-        for i, objvar in enumerate(self.obj.nonbasic):
-            if objvar.coef > 0:
-                all_pos = True
-                for con in self.con:
-                    if con.nonbasic[i].coef < 0:
-                        all_pos = False
-                        break
-                if all_pos:
-                    return True
-        return False
+        return self.unbounded
 
     def is_optimal(self):
         optimal = True
@@ -307,52 +757,141 @@ class SimplexDictionary:
                 optimal = False
         return optimal
 
-    def should_continue(self):
-        unbounded = self.is_unbounded()
-        optimal = self.is_optimal()
-        return (not optimal) and (not unbounded)
+    def can_start_dual(self):
+        """Returns True if the objective function is already optimal, so
+        that the dual simplex method can start from this dictionary. An
+        objective function which is identically zero is left to the
+        auxiliary LP, since every dual pivot would be degenerate."""
+        nonzero = any(var.coef != 0 for var in self.obj.nonbasic)
+        return nonzero and self.is_optimal() and not self.bounded
 
     def pivot(self, entering, leaving):
-        for i, c in enumerate(self.con):
-            if c.basic.name == leaving:
-                # Pivot entering into basis in leaving row
-                c.rearrange_in_terms_of(entering)
-                done, expression = (i, c)
-                break
+        n = self.highest_index
+        self.pivot_variable(variable_id(entering, n), variable_id(leaving, n))
+
+    def pivot_variable(self, entering, leaving):
+        """Pivots the variable with id entering into the basis in
+        place of the variable with id leaving."""
+        done, column = self.row_of[leaving], self.column_of[entering]
+        # Pivot entering into basis in leaving row
+        expression = self.con[done]
+        expression.rearrange_in_terms_of(column)
         # For every other constraint row,
         # substitute in the new definition of
         # the leaving variable
         for i, c in enumerate(self.con):
             if i != done:
-                c.redefine_term(expression)
+                c.redefine_term(expression, column)
         # Substitute new definition into objective function
-        self.obj.redefine_term(expression)
+        self.obj.redefine_term(expression, column)
+        self.row_of[entering], self.row_of[leaving] = done, None
+        self.column_of[entering], self.column_of[leaving] = None, column
+        self.record_pivot(entering, leaving, expression.scalar.denominator)
+
+    def complement(self, var_id):
+        """Replaces the variable with the given id by its upper bound
+        minus itself, in its row if it is basic, or in every equation if
+        it is nonbasic."""
+        row = self.row_of[var_id]
+        if row is not None:
+            constraint = self.con[row]
+            constraint.scalar = constraint.basic.upper - constraint.scalar
+            for term in constraint.nonbasic:
+                term.coef = -term.coef
+            constraint.basic.complemented = not constraint.basic.complemented
+            return
+        column = self.column_of[var_id]
+        for equation in [self.obj, *self.con]:
+            term = equation.nonbasic[column]
+            equation.scalar += term.coef*term.upper
+            term.coef = -term.coef
+            term.complemented = not term.complemented
 
     def run(self):
-        while self.should_continue():
-            entering, leaving = self.rule(self.obj, self.con)
+        """Pivots until the rule finds the dictionary optimal, or finds
+        an entering variable which can grow without bound, which is
+        remembered for is_unbounded()."""
+        self.stalled = 0
+        n = self.highest_index
+        while True:
+            entering, leaving = self.select_rule()(self.obj, self.con)
+            if entering is None or leaving is None:
+                self.unbounded = entering is not None
+                break
+            # The rules only see the equations, so the rows their ratio
+            # test compared are counted here
+            column = self.column_of[variable_id(entering, n)]
+            self.ratio_candidates += sum(con.nonbasic[column].coef < 0 or
+                                         (con.nonbasic[column].coef > 0 and con.basic.upper != inf)
+                                         for con in self.con)
+            before = self.obj.scalar
+            if leaving == entering:
+                # The entering variable only moves to its upper bound
+                self.complement(variable_id(entering, n))
+                self.bound_flips += 1
+            else:
+                row = self.con[self.row_of[variable_id(leaving, n)]]
+                if row.nonbasic[column].coef > 0:
+                    # The leaving variable stops at its upper bound
+                    self.complement(row.basic.id)
+                self.pivot(entering, leaving)
+            self.record_progress(before)
+
+    def run_dual(self):
+        """Runs the dual simplex method on an infeasible dictionary whose
+        objective function is already optimal. Returns False if the LP
+        turns out to be infeasible, and True once the dictionary is
+        feasible, and so optimal. A basic variable above its upper bound
+        is complemented, which leaves it below zero for the dual rule."""
+        while not self.is_feasible():
+            for constraint in self.con:
+                if constraint.scalar > constraint.basic.upper:
+                    self.complement(constraint.basic.id)
+            entering, leaving = self.dual_rule(self.obj, self.con)
+            if entering is None:
+                return False
             self.pivot(entering, leaving)
+        return True
 
-    def report(self):
-        """Generates an output string in accordance
-        with the project spec."""
-        # Format Output
-        if not self.is_feasible():
-            print("infeasible")
-        elif self.is_unbounded():
-            print("unbounded")
-        elif self.is_optimal():
-            print("optimal")
-            print(f"{float(self.obj.scalar):.7g}")
-            coords = self.coordinates()
-            for i, c in enumerate(coords):
-                if i != len(coords)-1:
-                    print(f"{float(c[1]):.7g}", end=' ')
-                else:
-                    print(f"{float(c[1]):.7g}")
-        else:
-            # This should never happen
-            print("infeasible")
+    def objective_value(self):
+        return self.obj.scalar
+
+    def dense(self):
+        """Returns the ids of the basic and nonbasic variables, and the
+        dictionary as float NumPy arrays: the coefficients of each
+        constraint, the scalars and the objective coefficients."""
+        basic = np.array([con.basic.id for con in self.con], dtype=int)
+        nonbasic = np.array([var.id for var in self.obj.nonbasic], dtype=int)
+        coefs = np.array([[float(var.coef) for var in con.nonbasic] for con in self.con])
+        scalars = np.array([float(con.scalar) for con in self.con])
+        objective = np.array([float(var.coef) for var in self.obj.nonbasic])
+        return basic, nonbasic, coefs.reshape(len(basic), len(nonbasic)), scalars, objective
+
+    def basis(self):
+        """Returns the ids of the basic variables, which can be given to
+        with_basis() to restart from this basis. Omega is left out."""
+        return [con.basic.id for con in self.con if con.basic.id != self.highest_index]
+
+    def with_basis(self, basis):
+        """Returns a new SimplexDictionary object which represents the
+        same LP after pivoting the variables with the given ids into the
+        basis. A variable which cannot be pivoted in, because the basis
+        would be singular, is skipped."""
+        lp = copy(self)
+        lp.obj = self.obj.duplicate()
+        lp.con = [constraint.duplicate() for constraint in self.con]
+        lp.row_of = list(self.row_of)
+        lp.column_of = list(self.column_of)
+        basis = set(basis)
+        for entering in sorted(basis):
+            column = lp.column_of[entering] if entering < len(lp.column_of) else None
+            if column is None:
+                continue
+            for con in lp.con:
+                if con.basic.id not in basis and con.nonbasic[column].coef != 0:
+                    lp.pivot_variable(entering, con.basic.id)
+                    break
+        return lp
 
     def coordinates(self):
         """Returns the values of the optimization variables
@@ -360,44 +899,61 @@ class SimplexDictionary:
         formatted as a list of tuples, with the first element
         representing the variable index, and the second element
         representing the value."""
-        coords = []
-        x = [(v.basic.index, v.scalar) for v in self.con if v.basic.vartype is VarType.optimization]
-        x.sort(key=lambda x: x[0])
-        j = 0
-        for i in range(self.highest_index):
-            try:
-                if x[j][0] == (i+1):
-                    coords.append(x[j])
-                    j += 1
-                else:
-                    coords.append((i+1,0))
-            except IndexError:
-                coords.append((i+1,0))  
+        coords = [(i+1, 0) for i in range(self.highest_index)]
+        # A complemented variable is its upper bound minus the value held
+        for var in self.obj.nonbasic:
+            if var.complemented and var.id < self.highest_index:
+                coords[var.id] = (var.index, var.upper)
+        for con in self.con:
+            if con.basic.id < self.highest_index:
+                value = con.basic.upper - con.scalar if con.basic.complemented else con.scalar
+                coords[con.basic.id] = (con.basic.index, value)
         return coords
 
     def convert(self):
         """Converts an auxiliary LP into an LP representing the
-        original problem, but now it is feasible."""
-        feasible_lp = deepcopy(self)
+        original problem, but now it is feasible. The constraints
+        are handed over to the new dictionary rather than copied, and
+        only the objective function is replaced, so the auxiliary LP
+        must not be used afterwards."""
+        feasible_lp = copy(self)
+        # A degenerate omega still in the basis is pivoted out first,
+        # otherwise its constraint is redundant and is dropped
+        row = self.row_of[self.highest_index]
+        if row is not None:
+            constraint = feasible_lp.con[row]
+            entering = [var.id for var in constraint.nonbasic if var.coef != 0]
+            if entering:
+                feasible_lp.pivot_variable(entering[0], self.highest_index)
+            else:
+                feasible_lp.con = [con for i, con in enumerate(feasible_lp.con) if i != row]
         # Remove omega column
-        omega_name = f"x_{self.omega_index}"
-        for var in feasible_lp.obj.nonbasic:
-            if var.name == omega_name:
-                feasible_lp.obj.nonbasic.remove(var)
-                break
-        for constraint in feasible_lp.con:
-            for var in constraint.nonbasic:
-                if var.name == omega_name:
-                    constraint.nonbasic.remove(var)
-                    break
-        # Redefine original objective function
-        temp_obj = deepcopy(self.original_obj)
-        feasible_lp.obj = deepcopy(self.original_obj)
-        for term in temp_obj.nonbasic:
+        column = feasible_lp.column_of[self.highest_index]
+        if column is not None:
             for constraint in feasible_lp.con:
-                if constraint.basic.name == term.name:
-                    feasible_lp.obj.redefine_term(constraint)
-                    break
+                constraint.nonbasic.pop(column)
+        # Redefine original objective function over the current columns
+        feasible_lp.obj = Objective([copy(var) for j, var in enumerate(self.obj.nonbasic) if j != column])
+        feasible_lp.obj.scalar = self.original_obj.scalar
+        for var in feasible_lp.obj.nonbasic:
+            var.coef = 0
+        feasible_lp.original_obj = None
+        feasible_lp.index_positions()
+        for term in self.original_obj.nonbasic:
+            row = feasible_lp.row_of[term.id]
+            coef = term.coef
+            var = feasible_lp.obj.nonbasic[feasible_lp.column_of[term.id]] if row is None else feasible_lp.con[row].basic
+            if var.complemented != term.complemented:
+                # Complemented since, so the term is coef*(upper - var)
+                feasible_lp.obj.scalar += coef*term.upper
+                coef = -coef
+            if row is None:
+                var.coef += coef
+            else:
+                constraint = feasible_lp.con[row]
+                feasible_lp.obj.scalar += constraint.scalar*coef
+                for var, new in zip(feasible_lp.obj.nonbasic, constraint.nonbasic):
+                    var.coef += new.coef*coef
         return feasible_lp
 
     def __repr__(self):
@@ -411,47 +967,3461 @@ class SimplexDictionary:
         return r
 
 
-def main():
+# Coefficients smaller than this are treated as zero by the float engines
+EPSILON = 1e-9
 
-    # Read STDIN encoding of LP
-    lines = sys.stdin.readlines()
-    lines = [x for x in lines if len(x.rstrip()) > 0]
+# Number of pivots after which a float dictionary is recomputed
+# from the original problem, discarding accumulated rounding error
+REFACTOR_INTERVAL = 50
 
-    # Get the number of constraint functions
-    num_constraints = len(lines) - 1
 
-    # Convert objective function to fractional coefficients
-    objective = [float(x) for x in lines[0].split()]
-    objective = [Fraction.from_float(x).limit_denominator() for x in objective]
+def variable_id(name, n):
+    """Inverse of variable_name()."""
+    index = int(name[2:])
+    return index - 1 if name.startswith("x") else n + index
 
-    # Convert constraint coefficients to fractional representation
-    constraints = []
-    for i in range(1, num_constraints+1):
-        constraints.append([float(x) for x in lines[i].split()])
-        constraints[i-1] = [Fraction.from_float(x).limit_denominator() for x in constraints[i-1]]
 
-    # Construct initial dictionary representation of LP
-    input_dictionary = SimplexDictionary(objective, constraints, blands_rule)
+def variable_name(var_id, n):
+    """Returns the name of the variable with the given integer id.
+    Optimization variables x_1..x_n have ids 0..n-1, omega has id n
+    and the slack variables w_1..w_m have ids n+1..n+m, so that
+    comparing ids gives the x < omega < w ordering of Bland's Rule."""
+    if var_id < n:
+        return f"x_{var_id+1}"
+    elif var_id == n:
+        return f"x_{n+1}"
+    return f"w_{var_id-n}"
 
-    # Solve LP if initial dictionary is feasible
-    if input_dictionary.is_feasible():
-        input_dictionary.run()
-        input_dictionary.report()
-    else:
-        # Construct and solve the auxiliary LP
-        auxiliary_lp = input_dictionary.get_auxiliary_lp()
-        auxiliary_lp.run()
-        # If auxiliary LP is unbounded, or has nonzero objective value
-        # Then original LP is infeasible
-        if auxiliary_lp.is_unbounded():
-            print("infeasible")
-        elif auxiliary_lp.obj.scalar != 0:
-            print("infeasible")
-        else:
-            # Otherwise, convert to an initially feasible dictionary and solve
-            feasible_dictionary = auxiliary_lp.convert()
-            feasible_dictionary.run()
-            feasible_dictionary.report()
+
+def vectorized_ratio_test(lp, column):
+    """Returns the row of the leaving variable when the nonbasic variable
+    in the given column of a TableauDictionary or RevisedSimplex enters,
+    the one with the minimum ratio with the lowest id breaking ties. The
+    row is None if the entering variable can be increased without bound."""
+    entering = lp.column(column)
+    rows = np.flatnonzero(entering < -EPSILON)
+    lp.ratio_candidates += len(rows)
+    if len(rows) == 0:
+        return None
+    ratios = lp.scalars()[rows] / -entering[rows]
+    tied = rows[ratios <= ratios.min() + EPSILON]
+    return tied[np.argmin(lp.basic[tied])]
+
+
+def vectorized_blands_rule(lp):
+    """Returns the column of the entering variable and the row of
+    the leaving variable in a TableauDictionary or RevisedSimplex,
+    chosen using Bland's Rule. The column is None if the dictionary
+    is optimal and the row is None if the entering variable can be
+    increased without bound."""
+    # Entering variable is the lowest id with a positive coefficient
+    reduced_costs = lp.reduced_costs()
+    candidates = np.flatnonzero(reduced_costs > EPSILON)
+    if len(candidates) == 0:
+        return None, None
+    column = candidates[np.argmin(lp.nonbasic[candidates])]
+
+    # Leaving variable has the minimum ratio, lowest id breaks ties
+    return column, vectorized_ratio_test(lp, column)
+
+
+def vectorized_dantzigs_rule(lp):
+    """Same as vectorized_blands_rule, but the entering variable is
+    chosen using the largest coefficient rule."""
+    reduced_costs = lp.reduced_costs()
+    column = int(np.argmax(reduced_costs))
+    if reduced_costs[column] <= EPSILON:
+        return None, None
+    return column, vectorized_ratio_test(lp, column)
+
+
+def vectorized_largest_increase_rule(lp):
+    """Same as vectorized_blands_rule, but the entering variable is the
+    one which increases the objective function the most once the ratio
+    test has bounded it."""
+    reduced_costs = lp.reduced_costs()
+    candidates = np.flatnonzero(reduced_costs > EPSILON)
+    if len(candidates) == 0:
+        return None, None
+    columns = lp.columns(candidates)
+    limiting = columns < -EPSILON
+    unbounded = np.flatnonzero(~limiting.any(axis=0))
+    if len(unbounded) > 0:
+        return candidates[unbounded[0]], None
+    # Bound on every candidate from its own ratio test
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.where(limiting, lp.scalars()[:, None] / -columns, np.inf)
+    increase = reduced_costs[candidates] * ratios.min(axis=0)
+    column = candidates[np.argmax(increase)]
+    return column, vectorized_ratio_test(lp, column)
+
+
+def vectorized_steepest_edge_rule(lp):
+    """Same as vectorized_blands_rule, but the entering variable is the
+    one whose edge of the feasible region makes the smallest angle with
+    the objective function, with the norms of the edges computed exactly
+    from the columns of the dictionary."""
+    reduced_costs = lp.reduced_costs()
+    candidates = np.flatnonzero(reduced_costs > EPSILON)
+    if len(candidates) == 0:
+        return None, None
+    norms = 1 + (lp.columns(candidates)**2).sum(axis=0)
+    column = candidates[np.argmax(reduced_costs[candidates]**2 / norms)]
+    return column, vectorized_ratio_test(lp, column)
+
+
+class VectorizedDevexRule:
+    """Same as DevexRule, for a TableauDictionary or RevisedSimplex.
+    The reference weights are stored in an array indexed by variable id."""
+
+    def __init__(self):
+        self.weights = None
+
+    def __call__(self, lp):
+        if self.weights is None:
+            self.weights = np.ones(lp.n+lp.m+1)
+        reduced_costs = lp.reduced_costs()
+        candidates = np.flatnonzero(reduced_costs > EPSILON)
+        if len(candidates) == 0:
+            return None, None
+        scores = reduced_costs[candidates]**2 / self.weights[lp.nonbasic[candidates]]
+        column = candidates[np.argmax(scores)]
+        row = vectorized_ratio_test(lp, column)
+        if row is None:
+            return column, None
+        # Update the weights from the pivot row
+        pivot_row = lp.row(row)
+        weight = self.weights[lp.nonbasic[column]]
+        ratios = pivot_row / pivot_row[column]
+        self.weights[lp.nonbasic] = np.maximum(self.weights[lp.nonbasic], ratios**2 * weight)
+        self.weights[lp.basic[row]] = max(weight / pivot_row[column]**2, 1)
+        return column, row
+
+
+class VectorizedPartialPricingRule:
+    """Same as PartialPricingRule, for a TableauDictionary or RevisedSimplex.
+    The revised engine only computes the reduced costs it is asked for,
+    so pricing a segment costs a fraction of pricing the whole row."""
+
+    def __init__(self, segments=4, candidates=4):
+        self.segments = segments
+        self.max_candidates = candidates
+        self.candidates = np.array([], dtype=int)
+        self.start = 0
+
+    def __call__(self, lp):
+        # Re-price the remembered candidates first
+        positions = np.flatnonzero(np.isin(lp.nonbasic, self.candidates))
+        reduced_costs = lp.reduced_costs(positions)
+        positions = positions[reduced_costs > EPSILON]
+        if len(positions) == 0:
+            k = len(lp.nonbasic)
+            size = -(-k // self.segments)
+            for _ in range(self.segments):
+                segment = (self.start + np.arange(min(size, k))) % k
+                self.start = (self.start + size) % k
+                reduced_costs = lp.reduced_costs(segment)
+                order = np.argsort(-reduced_costs)[:self.max_candidates]
+                positions = segment[order][reduced_costs[order] > EPSILON]
+                if len(positions) > 0:
+                    break
+            else:
+                return None, None
+        reduced_costs = lp.reduced_costs(positions)
+        column = positions[np.argmax(reduced_costs)]
+        self.candidates = lp.nonbasic[positions[positions != column]]
+        return column, vectorized_ratio_test(lp, column)
+
+
+def vectorized_enter_basis(lp, basis):
+    """Pivots the variables with the given ids into the basis of a
+    TableauDictionary or RevisedSimplex, each in the row with the largest
+    coefficient among those whose basic variable is not in the basis.
+    A variable which would make the basis singular is skipped. A basis
+    with one variable for every row is factorized at once instead, unless
+    it is singular."""
+    basis = np.array(sorted(basis), dtype=int)
+    variables = np.concatenate([lp.basic, lp.nonbasic])
+    if len(set(basis)) == lp.m and np.isin(basis, variables).all():
+        basic, nonbasic = lp.basic, lp.nonbasic
+        lp.basic, lp.nonbasic = basis, np.setdiff1d(variables, basis)
+        try:
+            lp.refactor()
+            return
+        except np.linalg.LinAlgError:
+            lp.basic, lp.nonbasic = basic, nonbasic
+    for entering in basis:
+        columns = np.flatnonzero(lp.nonbasic == entering)
+        if len(columns) == 0:
+            continue
+        coefs = np.abs(lp.column(columns[0]))
+        coefs[np.isin(lp.basic, basis)] = 0
+        row = np.argmax(coefs)
+        if coefs[row] > EPSILON:
+            lp.pivot_position(columns[0], row)
+    lp.refactor()
+
+
+def vectorized_dual_ratio_test(lp, row, harris=False):
+    """Returns the column of the entering variable of a dual simplex
+    pivot on the given row of a TableauDictionary or RevisedSimplex, or
+    None if the row proves the LP is infeasible. Ties are broken by the
+    lowest index, or with Harris' ratio test if requested: of the columns
+    whose ratio is within EPSILON of the minimum, the one with the largest
+    coefficient is chosen, so that tiny pivots are avoided."""
+    coefs = lp.row(row)
+    columns = np.flatnonzero(coefs > lp.tolerance)
+    if len(columns) == 0:
+        return None
+    coefs = coefs[columns]
+    reduced_costs = np.maximum(-lp.reduced_costs()[columns], 0)
+    if harris:
+        bound = np.min((reduced_costs + EPSILON) / coefs)
+        tied = np.flatnonzero(reduced_costs / coefs <= bound)
+        return columns[tied[np.argmax(coefs[tied])]]
+    ratios = reduced_costs / coefs
+    tied = columns[ratios <= ratios.min() + EPSILON]
+    return tied[np.argmin(lp.nonbasic[tied])]
+
+
+def vectorized_dual_blands_rule(lp):
+    """Same as dual_blands_rule, for a TableauDictionary or RevisedSimplex.
+    Returns the column of the entering variable and the row of the leaving
+    variable. The row is None if the dictionary is feasible, and the column
+    is None if the row proves the LP is infeasible."""
+    rows = np.flatnonzero(lp.scalars() < -EPSILON)
+    if len(rows) == 0:
+        return None, None
+    row = rows[np.argmin(lp.basic[rows])]
+    return vectorized_dual_ratio_test(lp, row), row
+
+
+def vectorized_dual_dantzigs_rule(lp):
+    """Same as vectorized_dual_blands_rule, but the leaving variable is
+    the one with the most negative value, and ties in the ratio test are
+    broken with Harris' ratio test."""
+    scalars = lp.scalars()
+    row = np.argmin(scalars)
+    if scalars[row] >= -EPSILON:
+        return None, None
+    return vectorized_dual_ratio_test(lp, row, harris=True), row
+
+
+class TableauDictionary(BaseDictionary):
+    """Stores the same dictionary as SimplexDictionary, but as a dense
+    2-D NumPy array of floats instead of Variable and Equation objects.
+    Row i < m holds constraint i and row m holds the objective function,
+    column j < k holds the coefficients of nonbasic variable j and
+    column k holds the scalars. Every pivot is a single rank-1 update
+    of the whole array. To stop rounding errors from accumulating, the
+    array is periodically recomputed from the original constraints."""
+
+    tolerance = 1e-7
+
+    def __init__(self, objective, constraints, rule):
+        if np is None:
+            raise ImportError("The tableau engine requires NumPy")
+        self.rule = rule
+        self.fallback_rule = vectorized_blands_rule
+        self.dual_rule = vectorized_dual_dantzigs_rule
+        self.dual_fallback_rule = vectorized_dual_blands_rule
+        self.n = len(objective)
+        self.m = len(constraints)
+        self.omega_index = self.n
+        self.original_obj = None
+        self.unbounded = False
+        # Basic and nonbasic variables are tracked by integer id
+        self.basic = np.arange(self.n+1, self.n+self.m+1)
+        self.nonbasic = np.arange(self.n)
+        # Keep the original problem as Ax - omega + w = b, with one
+        # column per variable id, for recomputing the dictionary
+        rows = np.array(constraints, dtype=float).reshape(self.m, self.n+1)
+        self.original = np.hstack([rows[:, :-1], -np.ones((self.m, 1)), np.eye(self.m)])
+        self.rhs = rows[:, -1]
+        self.cost = np.zeros(self.n+self.m+1)
+        self.cost[:self.n] = np.array(objective, dtype=float)
+        self.pivots_since_refactor = 0
+        self.refactor()
+
+    def refactor(self):
+        """Recomputes the dictionary for the current basis directly
+        from the original constraints and objective function."""
+        m = self.m
+        table = np.zeros((m+1, len(self.nonbasic)+1))
+        if m > 0:
+            columns = np.column_stack([self.original[:, self.nonbasic], -self.rhs])
+            table[:m] = -np.linalg.solve(self.original[:, self.basic], columns)
+        table[m] = self.cost[self.basic] @ table[:m]
+        table[m, :-1] += self.cost[self.nonbasic]
+        table[np.abs(table) < EPSILON] = 0
+        self.table = table
+        self.pivots_since_refactor = 0
+
+    def get_auxiliary_lp(self):
+        """Returns a new TableauDictionary object which represents
+        the auxiliary LP, after its initial pivot has been performed
+        to make it feasible. It shares the original constraints."""
+        auxiliary_lp = copy(self)
+        auxiliary_lp.original_obj = self.cost
+        auxiliary_lp.basic = self.basic.copy()
+        # Add an omega column, the objective function is just -omega
+        auxiliary_lp.nonbasic = np.append(self.nonbasic, self.omega_index)
+        auxiliary_lp.table = np.insert(self.table, len(self.nonbasic), 1.0, axis=1)
+        auxiliary_lp.table[self.m, :] = 0
+        auxiliary_lp.table[self.m, -2] = -1
+        # The original column of omega is -B1, where B is the basis, so
+        # that the dictionary stays the same when it is recomputed
+        auxiliary_lp.original = self.original.copy()
+        auxiliary_lp.original[:, self.omega_index] = -self.original[:, self.basic].sum(axis=1)
+        auxiliary_lp.cost = np.zeros_like(self.cost)
+        auxiliary_lp.cost[self.omega_index] = -1
+        if not auxiliary_lp.is_feasible():
+            row = int(np.argmin(self.table[:self.m, -1]))
+            auxiliary_lp.pivot_position(len(self.nonbasic), row)
+        return auxiliary_lp
+
+    def is_feasible(self):
+        return bool((self.table[:self.m, -1] >= -EPSILON).all())
+
+    def is_unbounded(self):
+        return self.unbounded
+
+    def is_optimal(self):
+        return bool((self.table[self.m, :len(self.nonbasic)] <= EPSILON).all())
+
+    def can_start_dual(self):
+        """Same as SimplexDictionary.can_start_dual()."""
+        return bool(self.reduced_costs().any()) and self.is_optimal()
+
+    def reduced_costs(self, positions=None):
+        reduced = self.table[self.m, :len(self.nonbasic)]
+        return reduced if positions is None else reduced[positions]
+
+    def column(self, column):
+        return self.table[:self.m, column]
+
+    def columns(self, positions):
+        return self.table[:self.m, positions]
+
+    def row(self, row):
+        return self.table[row, :len(self.nonbasic)]
+
+    def scalars(self):
+        return self.table[:self.m, -1]
+
+    def pivot_position(self, column, row):
+        """Pivots the nonbasic variable in the given column into the
+        basis, in place of the basic variable of the given row."""
+        table = self.table
+        divisor = table[row, column]
+        # Rearrange the leaving row in terms of the entering variable
+        new_row = -table[row] / divisor
+        new_row[column] = 1 / divisor
+        # Substitute it into every other row, objective included
+        multipliers = table[:, column].copy()
+        multipliers[row] = 0
+        table[:, column] = 0
+        table += np.outer(multipliers, new_row)
+        table[row] = new_row
+        # Round away the noise left behind by cancellation
+        table[np.abs(table) < EPSILON] = 0
+        self.basic[row], self.nonbasic[column] = self.nonbasic[column], self.basic[row]
+        self.pivots_since_refactor += 1
+        if self.pivots_since_refactor == REFACTOR_INTERVAL:
+            self.refactor()
+        self.record_pivot(self.basic[row], self.nonbasic[column])
+
+    def pivot(self, entering, leaving):
+        names = [variable_name(v, self.n) for v in self.nonbasic]
+        column = names.index(entering)
+        names = [variable_name(v, self.n) for v in self.basic]
+        row = names.index(leaving)
+        self.pivot_position(column, row)
+
+    def run(self):
+        self.stalled = 0
+        while True:
+            column, row = self.select_rule()(self)
+            if column is not None and row is not None:
+                before = self.objective_value()
+                self.pivot_position(column, row)
+                self.record_progress(before)
+                continue
+            # Only stop once a freshly computed dictionary agrees
+            if self.pivots_since_refactor == 0:
+                self.unbounded = column is not None
+                break
+            self.refactor()
+
+    def run_dual(self):
+        """Same as SimplexDictionary.run_dual(), falling back to Bland's
+        Rule if the dual simplex method stalls."""
+        self.stalled = 0
+        while True:
+            column, row = self.select_dual_rule()(self)
+            if column is not None:
+                before = self.objective_value()
+                self.pivot_position(column, row)
+                self.record_progress(before, dual=True)
+                continue
+            # Only stop once a freshly computed dictionary agrees
+            if self.pivots_since_refactor == 0:
+                return row is None
+            self.refactor()
+
+    def objective_value(self):
+        return self.table[self.m, -1]
+
+    def dense(self):
+        """Same as SimplexDictionary.dense()."""
+        k = len(self.nonbasic)
+        return self.basic, self.nonbasic, self.table[:self.m, :k], self.table[:self.m, -1], self.table[self.m, :k]
+
+    def basis(self):
+        """Same as SimplexDictionary.basis()."""
+        return [int(v) for v in self.basic if v != self.omega_index]
+
+    def with_basis(self, basis):
+        """Same as SimplexDictionary.with_basis()."""
+        lp = copy(self)
+        lp.basic = self.basic.copy()
+        lp.nonbasic = self.nonbasic.copy()
+        lp.table = self.table.copy()
+        vectorized_enter_basis(lp, basis)
+        return lp
+
+    def coordinates(self):
+        """Returns the values of the optimization variables in the
+        same format as SimplexDictionary.coordinates()."""
+        coords = [(i+1, 0) for i in range(self.n)]
+        for row, var in enumerate(self.basic):
+            if var < self.n:
+                coords[var] = (var+1, self.table[row, -1])
+        return coords
+
+    def convert(self):
+        """Returns a new TableauDictionary object which represents
+        the dictionary of the auxiliary LP after it has been trans-
+        formed to represent the original (now feasible) problem. It
+        shares the original constraints with the auxiliary LP."""
+        feasible_lp = copy(self)
+        feasible_lp.basic = self.basic.copy()
+        feasible_lp.nonbasic = self.nonbasic.copy()
+        feasible_lp.table = self.table.copy()
+        # A degenerate omega still in the basis is pivoted out first
+        rows = np.flatnonzero(feasible_lp.basic == self.omega_index)
+        if len(rows) > 0:
+            row = rows[0]
+            k = len(feasible_lp.nonbasic)
+            columns = np.flatnonzero(np.abs(feasible_lp.table[row, :k]) > EPSILON)
+            if len(columns) > 0:
+                feasible_lp.pivot_position(columns[0], row)
+            else:
+                # The constraint is redundant, drop it entirely
+                feasible_lp.basic = np.delete(feasible_lp.basic, row)
+                feasible_lp.original = np.delete(feasible_lp.original, row, axis=0)
+                feasible_lp.rhs = np.delete(feasible_lp.rhs, row)
+                feasible_lp.m -= 1
+        # Remove omega column
+        feasible_lp.nonbasic = feasible_lp.nonbasic[feasible_lp.nonbasic != self.omega_index]
+        # Redefine original objective function
+        feasible_lp.cost = self.original_obj
+        feasible_lp.original_obj = None
+        feasible_lp.refactor()
+        return feasible_lp
+
+    def __repr__(self):
+        r = f"Feasible: {self.is_feasible()}\n"
+        r += f"Optimal: {self.is_optimal()}\n"
+        r += f"Unbounded: {self.is_unbounded()}\n\n"
+        r += f"Nonbasic: {[variable_name(v, self.n) for v in self.nonbasic]}\n"
+        r += f"Objective: {self.table[self.m]}\n"
+        r += "Constraints:\n"
+        for row, var in enumerate(self.basic):
+            r += f"{variable_name(var, self.n)} = {self.table[row]}\n"
+        return r
+
+
+class SparseMatrix:
+    """Stores a matrix in compressed sparse column (CSC) form, so that
+    memory and the cost of products scale with the number of nonzero
+    entries. The entries of column j are data[indptr[j]:indptr[j+1]],
+    in the rows given by the same slice of indices."""
+
+    def __init__(self, shape, rows, cols, values):
+        self.shape = shape
+        order = np.lexsort((rows, cols))
+        self.indices = np.asarray(rows, dtype=np.int64)[order]
+        self.data = np.asarray(values, dtype=float)[order]
+        # Column of every stored entry, used for vectorized products
+        self.entry_columns = np.asarray(cols, dtype=np.int64)[order]
+        counts = np.bincount(self.entry_columns, minlength=shape[1])
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def column(self, j):
+        """Returns column j as a dense vector."""
+        result = np.zeros(self.shape[0])
+        start, end = self.indptr[j], self.indptr[j+1]
+        result[self.indices[start:end]] = self.data[start:end]
+        return result
+
+    def columns(self, ids):
+        """Returns the given columns as a dense matrix."""
+        result = np.zeros((self.shape[0], len(ids)))
+        for position, j in enumerate(ids):
+            start, end = self.indptr[j], self.indptr[j+1]
+            result[self.indices[start:end], position] = self.data[start:end]
+        return result
+
+    def replace_column(self, j, values):
+        """Returns a copy of the matrix with column j replaced by the
+        nonzeros of the dense vector values."""
+        keep = self.entry_columns != j
+        rows = np.flatnonzero(values)
+        return SparseMatrix(self.shape, np.concatenate([self.indices[keep], rows]),
+                            np.concatenate([self.entry_columns[keep], np.full(len(rows), j)]),
+                            np.concatenate([self.data[keep], values[rows]]))
+
+    def left_multiply(self, y, ids=None):
+        """Returns the row vector y A, or only its entries for the
+        columns with the given ids."""
+        if ids is None:
+            return np.bincount(self.entry_columns, weights=y[self.indices]*self.data,
+                               minlength=self.shape[1])
+        # Gather the stored entries of just the requested columns
+        starts = self.indptr[ids]
+        lengths = self.indptr[np.asarray(ids)+1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        entries = offsets + np.arange(lengths.sum())
+        return np.bincount(np.repeat(np.arange(len(ids)), lengths),
+                           weights=y[self.indices[entries]]*self.data[entries], minlength=len(ids))
+
+
+class BasisFactorization:
+    """Represents a basis matrix B as LU factors followed by a file of
+    eta columns, one for each pivot since the factorization was computed.
+    Provides FTRAN (solve B x = a) and BTRAN (solve y B = c).
+
+    Basic slack variables are columns of the identity matrix, so only
+    the kernel formed by the other basic columns and the rows without a
+    basic slack is factorized, as P K = L U with partial pivoting. With
+    SciPy, LAPACK factorizes the kernel and each solve is its forward and
+    back substitution with L and U. NumPy alone has no triangular solve,
+    and substituting one row at a time in Python makes the revised engine
+    three to five times slower on the netlib LPs, so the triangular
+    factors are inverted instead, once per factorization. Each solve is
+    then a pair of matrix-vector products. Partial pivoting keeps the
+    entries of L at most one in magnitude, which in practice keeps its
+    inverse well conditioned, and the basis is factorized again after
+    REFACTOR_INTERVAL pivots, which bounds the error the products and
+    the eta file can gather."""
+
+    def __init__(self, original, basic, first_slack):
+        """Factorizes the columns of the SparseMatrix original
+        whose ids are listed in basic."""
+        is_slack = basic >= first_slack
+        self.slack_positions = np.flatnonzero(is_slack)
+        self.slack_rows = basic[is_slack] - first_slack
+        self.kernel_positions = np.flatnonzero(~is_slack)
+        covered = np.zeros(len(basic), dtype=bool)
+        covered[self.slack_rows] = True
+        self.kernel_rows = np.flatnonzero(~covered)
+        columns = original.columns(basic[self.kernel_positions])
+        self.off_kernel = columns[self.slack_rows]
+        # LU factorization of the kernel with partial pivoting, whose unit
+        # lower and upper triangular factors share the matrix lu
+        lu = columns[self.kernel_rows]
+        r = len(lu)
+        perm = np.arange(r)
+        if scipy is not None and r:
+            with warnings.catch_warnings():
+                # A singular kernel is reported below like without SciPy
+                warnings.simplefilter("ignore", scipy.linalg.LinAlgWarning)
+                lu, pivots = scipy.linalg.lu_factor(lu, check_finite=False)
+            # LAPACK swaps row k with row pivots[k], one after the other
+            for k, p in enumerate(pivots):
+                perm[[k, p]] = perm[[p, k]]
+        else:
+            for k in range(r):
+                p = k + int(np.argmax(np.abs(lu[k:, k])))
+                if p != k:
+                    lu[[k, p]] = lu[[p, k]]
+                    perm[[k, p]] = perm[[p, k]]
+                if lu[k, k] == 0:
+                    break
+                lu[k+1:, k] /= lu[k, k]
+                lu[k+1:, k+1:] -= np.outer(lu[k+1:, k], lu[k, k+1:])
+        if not np.diag(lu).all():
+            raise np.linalg.LinAlgError("Singular basis matrix")
+        self.lu = lu
+        if scipy is None:
+            self.lower_inverse = np.linalg.inv(np.tril(lu, -1) + np.eye(r))
+            self.upper_inverse = np.linalg.inv(np.triu(lu))
+        self.kernel_rows = self.kernel_rows[perm]
+        # The rows are permuted already, so LAPACK swaps none of them
+        self.no_pivots = np.arange(r, dtype=np.int32)
+        self.etas = []
+
+    def solve_kernel(self, rhs, transposed=False):
+        """Solves K x = rhs for the permuted kernel K = L U, or K^T x = rhs
+        if transposed is True."""
+        if scipy is None:
+            if transposed:
+                return (rhs @ self.upper_inverse) @ self.lower_inverse
+            return self.upper_inverse @ (self.lower_inverse @ rhs)
+        if not len(self.lu):
+            return np.array(rhs, dtype=float)
+        x, _ = scipy.linalg.lapack.dgetrs(self.lu, self.no_pivots, rhs, trans=int(transposed))
+        return x
+
+    def ftran(self, a):
+        """Returns x such that B x = a. If a is a matrix, solves
+        for each of its columns."""
+        x = np.empty(a.shape)
+        kernel = self.solve_kernel(a[self.kernel_rows])
+        x[self.kernel_positions] = kernel
+        x[self.slack_positions] = a[self.slack_rows] - self.off_kernel @ kernel
+        for row, eta in self.etas:
+            pivot = np.array(x[row])
+            if pivot.any():
+                x += np.multiply.outer(eta, pivot)
+                x[row] = pivot * eta[row]
+        return x
+
+    def btran(self, c):
+        """Returns y such that y B = c."""
+        c = np.array(c, dtype=float)
+        for row, eta in reversed(self.etas):
+            c[row] = c @ eta
+        y = np.empty(len(c))
+        y[self.slack_rows] = c[self.slack_positions]
+        rest = c[self.kernel_positions] - y[self.slack_rows] @ self.off_kernel
+        y[self.kernel_rows] = self.solve_kernel(rest, True)
+        return y
+
+    def update(self, row, alpha):
+        """Records the pivot which replaces the basic variable of the
+        given row, where alpha = B^-1 a is the entering column."""
+        eta = -alpha / alpha[row]
+        eta[row] = 1 / alpha[row]
+        self.etas.append((row, eta))
+
+
+class RevisedSimplex(BaseDictionary):
+    """Solves the LP with the revised simplex method. The original
+    constraint matrix is never modified. Instead the basis is kept as
+    a BasisFactorization, and each iteration only computes the objective
+    row of the dictionary (pricing) and the column of the entering
+    variable, so that the cost of a pivot depends on the size of the
+    basis rather than that of the whole dictionary. Provides the same
+    interface as TableauDictionary, so that it can share its rules."""
+
+    tolerance = 1e-7
+
+    def __init__(self, objective, constraints, rule):
+        if np is None:
+            raise ImportError("The revised simplex engine requires NumPy")
+        self.rule = rule
+        self.fallback_rule = vectorized_blands_rule
+        self.dual_rule = vectorized_dual_dantzigs_rule
+        self.dual_fallback_rule = vectorized_dual_blands_rule
+        self.n = len(objective)
+        self.m = len(constraints)
+        self.omega_index = self.n
+        self.original_obj = None
+        self.unbounded = False
+        # Basic and nonbasic variables are tracked by integer id
+        self.basic = np.arange(self.n+1, self.n+self.m+1)
+        self.nonbasic = np.arange(self.n)
+        # The original problem as Ax - omega + w = b, one sparse
+        # column per id, built from the nonzero coefficients only
+        if isinstance(constraints, SparseConstraints):
+            rows = np.repeat(np.arange(self.m), np.diff(constraints.indptr))
+            cols, values = constraints.indices, constraints.data
+        elif isinstance(constraints, np.ndarray):
+            dense = constraints.reshape(self.m, self.n+1)
+            rows, cols = np.nonzero(dense[:, :-1])
+            values = dense[rows, cols]
+        else:
+            entries = np.array([(i, j, float(coef)) for i, constraint in enumerate(constraints)
+                                for j, coef in row_items(constraint)]).reshape(-1, 3)
+            rows, cols, values = entries[:, 0].astype(np.int64), entries[:, 1].astype(np.int64), entries[:, 2]
+        slacks = np.arange(self.m)
+        self.original = SparseMatrix((self.m, self.n+self.m+1),
+                                     np.concatenate([rows, slacks, slacks]),
+                                     np.concatenate([cols, np.full(self.m, self.omega_index), self.n+1+slacks]),
+                                     np.concatenate([values, -np.ones(self.m), np.ones(self.m)]))
+        if isinstance(constraints, SparseConstraints):
+            self.rhs = np.array(constraints.rhs, dtype=float)
+        else:
+            self.rhs = np.array([float(constraint[-1]) for constraint in constraints])
+        self.cost = np.zeros(self.n+self.m+1)
+        self.cost[:self.n] = np.array(objective, dtype=float)
+        self.refactor()
+
+    def refactor(self):
+        """Computes a fresh factorization of the current basis, which
+        empties the eta file, and recomputes the basic variables."""
+        self.factorization = BasisFactorization(self.original, self.basic, self.n+1)
+        self.values = self.factorization.ftran(self.rhs)
+        self.values[np.abs(self.values) < EPSILON] = 0
+        self.entering = None
+
+    def get_auxiliary_lp(self):
+        """Returns a new RevisedSimplex object which represents
+        the auxiliary LP, after its initial pivot has been performed
+        to make it feasible. It shares the original constraints."""
+        auxiliary_lp = copy(self)
+        auxiliary_lp.original_obj = self.cost
+        auxiliary_lp.basic = self.basic.copy()
+        auxiliary_lp.nonbasic = np.append(self.nonbasic, self.omega_index)
+        auxiliary_lp.cost = np.zeros_like(self.cost)
+        auxiliary_lp.cost[self.omega_index] = -1
+        if (self.basic < self.omega_index).any():
+            # Starting from a basis B other than the slack variables, the
+            # original column of omega is -B1 instead of -1, so that its
+            # column of the dictionary is still all ones
+            entries = np.isin(self.original.entry_columns, self.basic)
+            column = np.bincount(self.original.indices[entries], weights=self.original.data[entries],
+                                 minlength=self.m)
+            auxiliary_lp.original = self.original.replace_column(self.omega_index, -column)
+        auxiliary_lp.refactor()
+        if not auxiliary_lp.is_feasible():
+            row = int(np.argmin(self.values))
+            auxiliary_lp.pivot_position(len(self.nonbasic), row)
+        return auxiliary_lp
+
+    def is_feasible(self):
+        return bool((self.values >= -EPSILON).all())
+
+    def is_unbounded(self):
+        return self.unbounded
+
+    def is_optimal(self):
+        return bool((self.reduced_costs() <= EPSILON).all())
+
+    def can_start_dual(self):
+        """Same as SimplexDictionary.can_start_dual()."""
+        return bool(self.reduced_costs().any()) and self.is_optimal()
+
+    def reduced_costs(self, positions=None):
+        """Returns the objective row coefficients of the nonbasic
+        variables, c_N - y N where y B = c_B, or only of those at
+        the given positions."""
+        ids = self.nonbasic if positions is None else self.nonbasic[positions]
+        y = self.factorization.btran(self.cost[self.basic])
+        reduced = self.cost[ids] - self.original.left_multiply(y, ids)
+        reduced[np.abs(reduced) < EPSILON] = 0
+        return reduced
+
+    def column(self, column):
+        """Returns the dictionary coefficients of the nonbasic variable
+        in the given column, -B^-1 a."""
+        if self.entering is None or self.entering[0] != column:
+            alpha = self.factorization.ftran(self.original.column(self.nonbasic[column]))
+            alpha[np.abs(alpha) < EPSILON] = 0
+            self.entering = (column, alpha)
+        return -self.entering[1]
+
+    def columns(self, positions):
+        """Returns the dictionary coefficients of the nonbasic variables
+        at the given positions, one column each."""
+        alpha = self.factorization.ftran(self.original.columns(self.nonbasic[positions]))
+        alpha[np.abs(alpha) < EPSILON] = 0
+        return -alpha
+
+    def row(self, row):
+        """Returns the dictionary coefficients of the nonbasic variables
+        in the given row, the row of -B^-1 N."""
+        unit = np.zeros(self.m)
+        unit[row] = 1
+        coefs = self.original.left_multiply(self.factorization.btran(unit), self.nonbasic)
+        coefs[np.abs(coefs) < EPSILON] = 0
+        return -coefs
+
+    def scalars(self):
+        return self.values
+
+    def pivot_position(self, column, row):
+        """Pivots the nonbasic variable in the given column into the
+        basis, in place of the basic variable of the given row."""
+        self.column(column)
+        alpha = self.entering[1]
+        theta = self.values[row] / alpha[row]
+        self.values -= theta * alpha
+        self.values[row] = theta
+        self.values[np.abs(self.values) < EPSILON] = 0
+        self.factorization.update(row, alpha)
+        self.basic[row], self.nonbasic[column] = self.nonbasic[column], self.basic[row]
+        self.entering = None
+        if len(self.factorization.etas) == REFACTOR_INTERVAL:
+            self.refactor()
+        self.record_pivot(self.basic[row], self.nonbasic[column])
+
+    def pivot(self, entering, leaving):
+        names = [variable_name(v, self.n) for v in self.nonbasic]
+        column = names.index(entering)
+        names = [variable_name(v, self.n) for v in self.basic]
+        row = names.index(leaving)
+        self.pivot_position(column, row)
+
+    def run(self):
+        self.stalled = 0
+        while True:
+            column, row = self.select_rule()(self)
+            if column is not None and row is not None:
+                before = self.objective_value()
+                self.pivot_position(column, row)
+                self.record_progress(before)
+                continue
+            # Only stop once a fresh factorization agrees
+            if len(self.factorization.etas) == 0:
+                self.unbounded = column is not None
+                break
+            self.refactor()
+
+    def run_dual(self):
+        """Same as SimplexDictionary.run_dual(), falling back to Bland's
+        Rule if the dual simplex method stalls."""
+        self.stalled = 0
+        while True:
+            column, row = self.select_dual_rule()(self)
+            if column is not None:
+                before = self.objective_value()
+                self.pivot_position(column, row)
+                self.record_progress(before, dual=True)
+                continue
+            # Only stop once a fresh factorization agrees
+            if len(self.factorization.etas) == 0:
+                return row is None
+            self.refactor()
+
+    def objective_value(self):
+        value = self.cost[self.basic] @ self.values
+        return 0 if abs(value) < EPSILON else value
+
+    def dense(self):
+        """Same as SimplexDictionary.dense()."""
+        coefs = self.columns(np.arange(len(self.nonbasic))).reshape(self.m, len(self.nonbasic))
+        return self.basic, self.nonbasic, coefs, self.values, self.reduced_costs()
+
+    def basis(self):
+        """Same as SimplexDictionary.basis()."""
+        return [int(v) for v in self.basic if v != self.omega_index]
+
+    def with_basis(self, basis):
+        """Same as SimplexDictionary.with_basis()."""
+        lp = copy(self)
+        lp.basic = self.basic.copy()
+        lp.nonbasic = self.nonbasic.copy()
+        lp.refactor()
+        vectorized_enter_basis(lp, basis)
+        return lp
+
+    def coordinates(self):
+        """Returns the values of the optimization variables in the
+        same format as SimplexDictionary.coordinates()."""
+        coords = [(i+1, 0) for i in range(self.n)]
+        for row, var in enumerate(self.basic):
+            if var < self.n:
+                coords[var] = (var+1, self.values[row])
+        return coords
+
+    def convert(self):
+        """Returns a new RevisedSimplex object which represents
+        the auxiliary LP after it has been transformed to represent
+        the original (now feasible) problem."""
+        feasible_lp = copy(self)
+        feasible_lp.basic = self.basic.copy()
+        feasible_lp.nonbasic = self.nonbasic.copy()
+        feasible_lp.refactor()
+        # A degenerate omega still in the basis is pivoted out first
+        rows = np.flatnonzero(feasible_lp.basic == self.omega_index)
+        if len(rows) > 0:
+            row = rows[0]
+            unit = np.zeros(self.m)
+            unit[row] = 1
+            # Row of B^-1 N gives the dictionary row of omega
+            omega_row = self.original.left_multiply(feasible_lp.factorization.btran(unit), feasible_lp.nonbasic)
+            columns = np.flatnonzero(np.abs(omega_row) > EPSILON)
+            # Otherwise the constraint is redundant, and omega stays 0
+            if len(columns) > 0:
+                feasible_lp.pivot_position(columns[0], row)
+        # Remove omega column
+        feasible_lp.nonbasic = feasible_lp.nonbasic[feasible_lp.nonbasic != self.omega_index]
+        # Restore the original objective function
+        feasible_lp.cost = self.original_obj
+        feasible_lp.original_obj = None
+        feasible_lp.refactor()
+        return feasible_lp
+
+    def __repr__(self):
+        r = f"Feasible: {self.is_feasible()}\n"
+        r += f"Optimal: {self.is_optimal()}\n\n"
+        r += f"Objective: {self.objective_value()}\n"
+        r += "Basis:\n"
+        for row, var in enumerate(self.basic):
+            r += f"{variable_name(var, self.n)} = {self.values[row]}\n"
+        return r
+
+
+def sparse_ratio_test(lp, entering):
+    """Returns the row of the leaving variable when the variable with id
+    entering enters a SparseDictionary, the one with the minimum ratio
+    with the lowest id breaking ties. Ratios are compared by cross
+    multiplication, which stays exact for integer coefficients too. The
+    row is None if the entering variable can be increased without bound."""
+    leaving = None
+    candidates = 0
+    for i in lp.column_rows[entering]:
+        coef = -lp.rows[i][entering]
+        if coef > 0:
+            candidates += 1
+            # scalar/coef < best_scalar/best_coef, both coefs positive
+            difference = lp.scalar[i]*best_coef - best_scalar*coef if leaving is not None else -1
+            if difference < 0 or (difference == 0 and lp.basic[i] < lp.basic[leaving]):
+                best_scalar, best_coef = lp.scalar[i], coef
+                leaving = i
+    lp.ratio_candidates += candidates
+    return leaving
+
+
+def sparse_blands_rule(lp):
+    """Returns the id of the entering variable and the row of the
+    leaving variable in a SparseDictionary, chosen using Bland's Rule.
+    The id is None if the dictionary is optimal and the row is None if
+    the entering variable can be increased without bound."""
+    # Entering variable is the lowest id with a positive coefficient
+    entering = min((v for v, coef in lp.obj.items() if coef > 0), default=None)
+    if entering is None:
+        return None, None
+
+    # Leaving variable has the minimum ratio, lowest id breaks ties
+    return entering, sparse_ratio_test(lp, entering)
+
+
+def sparse_dantzigs_rule(lp):
+    """Same as sparse_blands_rule, but the entering variable is
+    chosen using the largest coefficient rule."""
+    entering = max((v for v, coef in lp.obj.items() if coef > 0), key=lambda v: (lp.obj[v], -v), default=None)
+    if entering is None:
+        return None, None
+    return entering, sparse_ratio_test(lp, entering)
+
+
+def sparse_largest_increase_rule(lp):
+    """Same as sparse_blands_rule, but the entering variable is the one
+    which increases the objective function the most once the ratio test
+    has bounded it."""
+    best = None
+    for v in sorted(lp.obj):
+        if lp.obj[v] > 0:
+            bound = min((lp.scalar[i] / -lp.rows[i][v] for i in lp.column_rows[v] if lp.rows[i][v] < 0),
+                        default=None)
+            if bound is None:
+                return v, None
+            if best is None or lp.obj[v]*bound > best:
+                best = lp.obj[v]*bound
+                entering = v
+    if best is None:
+        return None, None
+    return entering, sparse_ratio_test(lp, entering)
+
+
+def sparse_steepest_edge_rule(lp):
+    """Same as sparse_blands_rule, but the entering variable is the one
+    whose edge of the feasible region makes the smallest angle with the
+    objective function. The norms of the edges are computed exactly from
+    the nonzeros of each column, in floats as they only steer the choice."""
+    best = None
+    for v in sorted(lp.obj):
+        if lp.obj[v] > 0:
+            norm = 1 + sum(float(lp.rows[i][v])**2 for i in lp.column_rows[v])
+            score = float(lp.obj[v])**2 / norm
+            if best is None or score > best:
+                best = score
+                entering = v
+    if best is None:
+        return None, None
+    return entering, sparse_ratio_test(lp, entering)
+
+
+class SparseDevexRule:
+    """Same as DevexRule, for a SparseDictionary. Only the weights of
+    the nonzeros of the pivot row can change."""
+
+    def __init__(self):
+        self.weights = {}
+
+    def __call__(self, lp):
+        best = None
+        for v in sorted(lp.obj):
+            if lp.obj[v] > 0:
+                score = float(lp.obj[v])**2 / self.weights.get(v, 1)
+                if best is None or score > best:
+                    best = score
+                    entering = v
+        if best is None:
+            return None, None
+        row = sparse_ratio_test(lp, entering)
+        if row is None:
+            return entering, None
+        # Update the weights from the pivot row
+        pivot = float(lp.rows[row][entering])
+        weight = self.weights.get(entering, 1)
+        for v, coef in lp.rows[row].items():
+            ratio = float(coef) / pivot
+            self.weights[v] = max(self.weights.get(v, 1), ratio**2 * weight)
+        self.weights[lp.basic[row]] = max(weight / pivot**2, 1)
+        return entering, row
+
+
+class SparsePartialPricingRule:
+    """Same as PartialPricingRule, for a SparseDictionary. The segments
+    are ranges of variable ids."""
+
+    def __init__(self, segments=4, candidates=4):
+        self.segments = segments
+        self.max_candidates = candidates
+        self.candidates = []
+        self.start = 0
+
+    def __call__(self, lp):
+        # Re-price the remembered candidates first
+        self.candidates = [v for v in self.candidates if lp.obj.get(v, 0) > 0]
+        if not self.candidates:
+            total = lp.n + lp.m + 1
+            size = -(-total // self.segments)
+            for _ in range(self.segments):
+                segment = [(self.start+j) % total for j in range(size)]
+                self.start = (self.start + size) % total
+                improving = [v for v in segment if lp.obj.get(v, 0) > 0]
+                if improving:
+                    improving.sort(key=lambda v: lp.obj[v], reverse=True)
+                    self.candidates = improving[:self.max_candidates]
+                    break
+            else:
+                return None, None
+        entering = max(self.candidates, key=lambda v: lp.obj[v])
+        self.candidates.remove(entering)
+        return entering, sparse_ratio_test(lp, entering)
+
+
+def sparse_dual_blands_rule(lp):
+    """Same as dual_blands_rule, for a SparseDictionary. Returns the id
+    of the entering variable and the row of the leaving variable."""
+    infeasible = [i for i, scalar in enumerate(lp.scalar) if scalar < 0]
+    row = min(infeasible, key=lambda i: lp.basic[i])
+    entering = None
+    for v, coef in lp.rows[row].items():
+        if coef > 0:
+            # Same exact comparison of ratios as sparse_ratio_test()
+            reduced_cost = -lp.obj.get(v, 0)
+            difference = reduced_cost*best_coef - best_cost*coef if entering is not None else -1
+            if difference < 0 or (difference == 0 and v < entering):
+                best_cost, best_coef = reduced_cost, coef
+                entering = v
+    return entering, row
+
+
+class SparseDictionary(BaseDictionary):
+    """Stores the same dictionary as SimplexDictionary with exact Fraction
+    arithmetic, but keeps each row as a dict from integer variable id to
+    coefficient, holding only the nonzero coefficients. The rows in which
+    each variable appears are indexed as well, so that a pivot only visits
+    the rows containing the entering variable and only the nonzeros of the
+    pivot row, and memory scales with the number of nonzeros."""
+
+    def __init__(self, objective, constraints, rule):
+        self.rule = rule
+        self.fallback_rule = sparse_blands_rule
+        self.dual_rule = sparse_dual_blands_rule
+        self.n = len(objective)
+        self.m = len(constraints)
+        self.omega_index = self.n
+        self.original_obj = None
+        self.unbounded = False
+        # Basic and nonbasic variables are tracked by integer id
+        self.basic = [self.n+1+i for i in range(self.m)]
+        self.rows = []
+        self.scalar = []
+        for constraint in constraints:
+            self.rows.append({j: -coef for j, coef in row_items(constraint)})
+            self.scalar.append(constraint[-1])
+        self.obj = {j: coef for j, coef in enumerate(objective) if coef != 0}
+        self.obj_scalar = 0
+        self.index_columns()
+
+    def index_columns(self):
+        """Rebuilds the map from variable id to the rows containing it."""
+        self.column_rows = defaultdict(set)
+        for i, row in enumerate(self.rows):
+            for v in row:
+                self.column_rows[v].add(i)
+
+    def get_auxiliary_lp(self):
+        """Returns a new SparseDictionary object which represents
+        the auxiliary LP, after its initial pivot has been performed
+        to make it feasible."""
+        auxiliary_lp = copy(self)
+        auxiliary_lp.original_obj = (self.obj, self.obj_scalar)
+        auxiliary_lp.basic = list(self.basic)
+        auxiliary_lp.scalar = list(self.scalar)
+        # Add omega to each constraint, the objective is just -omega
+        auxiliary_lp.rows = [{**row, self.omega_index: Fraction(1)} for row in self.rows]
+        auxiliary_lp.obj = {self.omega_index: Fraction(-1)}
+        auxiliary_lp.obj_scalar = 0
+        auxiliary_lp.index_columns()
+        if not auxiliary_lp.is_feasible():
+            row = self.scalar.index(min(self.scalar))
+            auxiliary_lp.pivot_variable(self.omega_index, row)
+        return auxiliary_lp
+
+    def is_feasible(self):
+        return all(scalar >= 0 for scalar in self.scalar)
+
+    def is_unbounded(self):
+        return self.unbounded
+
+    def is_optimal(self):
+        return all(coef <= 0 for coef in self.obj.values())
+
+    def can_start_dual(self):
+        """Same as SimplexDictionary.can_start_dual()."""
+        return bool(self.obj) and self.is_optimal()
+
+    def substitute(self, row, expression, expression_scalar, entering, i=None):
+        """Substitutes the expression for the entering variable into the
+        given row, which is constraint i or the objective if i is None.
+        Returns the change to the row's scalar."""
+        multiplier = row.pop(entering)
+        for v, coef in expression.items():
+            value = row.get(v, 0) + multiplier*coef
+            if value != 0:
+                row[v] = value
+                if i is not None:
+                    self.column_rows[v].add(i)
+            elif v in row:
+                del row[v]
+                if i is not None:
+                    self.column_rows[v].discard(i)
+        return multiplier*expression_scalar
+
+    def pivot_variable(self, entering, r):
+        """Pivots the variable with id entering into the basis, in
+        place of the basic variable of row r."""
+        # Rearrange row r in terms of the entering variable
+        row = self.rows[r]
+        divisor = row.pop(entering)
+        leaving = self.basic[r]
+        expression = {v: -coef/divisor for v, coef in row.items()}
+        expression[leaving] = 1/divisor
+        expression_scalar = -self.scalar[r]/divisor
+        self.rows[r] = expression
+        self.scalar[r] = expression_scalar
+        self.basic[r] = entering
+        self.column_rows[leaving].add(r)
+        # Substitute it into the other rows containing the entering variable
+        for i in self.column_rows.pop(entering):
+            if i != r:
+                self.scalar[i] += self.substitute(self.rows[i], expression, expression_scalar, entering, i)
+        if entering in self.obj:
+            self.obj_scalar += self.substitute(self.obj, expression, expression_scalar, entering)
+        self.record_pivot(entering, leaving, expression_scalar.denominator)
+
+    def pivot(self, entering, leaving):
+        ids = {variable_name(v, self.n): v for v in range(self.n+self.m+1)}
+        self.pivot_variable(ids[entering], self.basic.index(ids[leaving]))
+
+    def dense(self):
+        """Same as SimplexDictionary.dense()."""
+        basic = np.array(self.basic, dtype=int)
+        nonbasic = np.setdiff1d(np.arange(self.n+self.m+1), basic)
+        if self.original_obj is None:
+            nonbasic = nonbasic[nonbasic != self.omega_index]
+        columns = {v: j for j, v in enumerate(nonbasic)}
+        coefs = np.zeros((self.m, len(nonbasic)))
+        for i, row in enumerate(self.rows):
+            for v, coef in row.items():
+                coefs[i, columns[v]] = float(coef)
+        scalars = np.array([float(scalar) for scalar in self.scalar])
+        objective = np.array([float(self.obj.get(v, 0)) for v in nonbasic])
+        return basic, nonbasic, coefs, scalars, objective
+
+    def basis(self):
+        """Same as SimplexDictionary.basis()."""
+        return [v for v in self.basic if v != self.omega_index]
+
+    def with_basis(self, basis):
+        """Returns a new SparseDictionary object which represents the
+        same LP after pivoting the variables with the given ids into the
+        basis. A variable which cannot be pivoted in, because the basis
+        would be singular, is skipped."""
+        lp = copy(self)
+        lp.basic = list(self.basic)
+        lp.scalar = list(self.scalar)
+        lp.rows = [dict(row) for row in self.rows]
+        lp.obj = dict(self.obj)
+        lp.index_columns()
+        basis = set(int(v) for v in basis)
+        for entering in basis.difference(lp.basic):
+            rows = [i for i in lp.column_rows[entering] if lp.basic[i] not in basis]
+            if rows:
+                # The shortest row keeps the dictionary sparse
+                lp.pivot_variable(entering, min(rows, key=lambda i: len(lp.rows[i])))
+        return lp
+
+    def run(self):
+        self.stalled = 0
+        while True:
+            entering, row = self.select_rule()(self)
+            if entering is None or row is None:
+                self.unbounded = entering is not None
+                break
+            before = self.obj_scalar
+            self.pivot_variable(entering, row)
+            self.record_progress(before)
+
+    def run_dual(self):
+        """Same as SimplexDictionary.run_dual()."""
+        while not self.is_feasible():
+            entering, row = self.dual_rule(self)
+            if entering is None:
+                return False
+            self.pivot_variable(entering, row)
+        return True
+
+    def objective_value(self):
+        return self.obj_scalar
+
+    def coordinates(self):
+        """Returns the values of the optimization variables in the
+        same format as SimplexDictionary.coordinates()."""
+        coords = [(i+1, 0) for i in range(self.n)]
+        for row, var in enumerate(self.basic):
+            if var < self.n:
+                coords[var] = (var+1, self.scalar[row])
+        return coords
+
+    def convert(self):
+        """Returns a new SparseDictionary object which represents
+        the dictionary of the auxiliary LP after it has been trans-
+        formed to represent the original (now feasible) problem."""
+        feasible_lp = copy(self)
+        feasible_lp.basic = list(self.basic)
+        feasible_lp.scalar = list(self.scalar)
+        feasible_lp.rows = [dict(row) for row in self.rows]
+        feasible_lp.index_columns()
+        # A degenerate omega still in the basis is pivoted out first,
+        # otherwise its constraint is redundant and omega stays 0
+        if self.omega_index in feasible_lp.basic:
+            row = feasible_lp.basic.index(self.omega_index)
+            if feasible_lp.rows[row]:
+                feasible_lp.pivot_variable(min(feasible_lp.rows[row]), row)
+        # Remove omega column
+        for i in feasible_lp.column_rows.pop(self.omega_index, ()):
+            del feasible_lp.rows[i][self.omega_index]
+        # Redefine original objective function
+        original_obj, feasible_lp.obj_scalar = self.original_obj
+        feasible_lp.obj = {}
+        for v, coef in original_obj.items():
+            if v in feasible_lp.basic:
+                i = feasible_lp.basic.index(v)
+                feasible_lp.obj[v] = coef
+                feasible_lp.obj_scalar += feasible_lp.substitute(
+                    feasible_lp.obj, feasible_lp.rows[i], feasible_lp.scalar[i], v)
+            else:
+                value = feasible_lp.obj.get(v, 0) + coef
+                if value != 0:
+                    feasible_lp.obj[v] = value
+                else:
+                    feasible_lp.obj.pop(v, None)
+        feasible_lp.original_obj = None
+        return feasible_lp
+
+    def __repr__(self):
+        name = lambda v: variable_name(v, self.n)
+        r = f"Feasible: {self.is_feasible()}\n"
+        r += f"Optimal: {self.is_optimal()}\n"
+        r += f"Unbounded: {self.is_unbounded()}\n\n"
+        r += f"Objective: {self.obj_scalar} {({name(v): c for v, c in sorted(self.obj.items())})}\n"
+        r += "Constraints:\n"
+        for i, row in enumerate(self.rows):
+            r += f"{name(self.basic[i])} = {self.scalar[i]} {({name(v): c for v, c in sorted(row.items())})}\n"
+        return r
+
+
+class IntegerDictionary(SparseDictionary):
+    """Stores the same dictionary as SparseDictionary, scaled up front so
+    that every coefficient is a Python int over one shared denominator,
+    the determinant of the basis. Pivots are fraction-free (Bareiss)
+    integer updates, whose divisions by the previous denominator are
+    always exact, so no gcd is computed until the result is reported."""
+
+    def __init__(self, objective, constraints, rule):
+        self.rule = rule
+        self.fallback_rule = sparse_blands_rule
+        self.dual_rule = sparse_dual_blands_rule
+        self.n = len(objective)
+        self.m = len(constraints)
+        self.omega_index = self.n
+        self.original_obj = None
+        self.unbounded = False
+        # Every constraint is scaled by the lcm of the denominators of all
+        # constraints, which scales the slack variables by the same amount,
+        # and the objective function by the lcm of its own denominators
+        self.row_scale = lcm(*(Fraction(coef).denominator for constraint in constraints
+                               for coef in [constraint[-1], *(a for _, a in row_items(constraint))]))
+        self.obj_scale = lcm(*(Fraction(coef).denominator for coef in objective))
+        self.denominator = 1
+        # Basic and nonbasic variables are tracked by integer id
+        self.basic = [self.n+1+i for i in range(self.m)]
+        self.rows = []
+        self.scalar = []
+        for constraint in constraints:
+            self.rows.append({j: int(-coef*self.row_scale) for j, coef in row_items(constraint)})
+            self.scalar.append(int(constraint[-1]*self.row_scale))
+        self.obj = {j: int(coef*self.obj_scale) for j, coef in enumerate(objective) if coef != 0}
+        self.obj_scalar = 0
+        self.index_columns()
+
+    def get_auxiliary_lp(self):
+        """Returns a new IntegerDictionary object which represents
+        the auxiliary LP, after its initial pivot has been performed
+        to make it feasible."""
+        auxiliary_lp = copy(self)
+        # The objective function is over the current denominator, which
+        # convert() takes as part of its scale
+        auxiliary_lp.original_obj = (self.obj, self.obj_scalar, self.obj_scale*self.denominator)
+        auxiliary_lp.basic = list(self.basic)
+        auxiliary_lp.scalar = list(self.scalar)
+        # Add omega to each constraint, scaled like the slack variables and
+        # over the current denominator, the objective is just -omega
+        omega = self.row_scale*self.denominator
+        auxiliary_lp.rows = [{**row, self.omega_index: omega} for row in self.rows]
+        auxiliary_lp.obj = {self.omega_index: -self.denominator}
+        auxiliary_lp.obj_scalar = 0
+        auxiliary_lp.obj_scale = 1
+        auxiliary_lp.index_columns()
+        if not auxiliary_lp.is_feasible():
+            row = self.scalar.index(min(self.scalar))
+            auxiliary_lp.pivot_variable(self.omega_index, row)
+        return auxiliary_lp
+
+    def update_row(self, row, scalar, expression, expression_scalar, entering, denominator, i=None):
+        """Updates the given row, which is constraint i or the objective if
+        i is None, for a pivot whose row of the entering variable is the
+        given expression over the new denominator. Returns the row's new
+        scalar."""
+        old = self.denominator
+        multiplier = row.pop(entering, 0)
+        if multiplier == 0:
+            # The row only changes denominator
+            if denominator != old:
+                for v in row:
+                    row[v] = row[v]*denominator // old
+            return scalar*denominator // old
+        for v in row:
+            row[v] *= denominator
+        for v, coef in expression.items():
+            value = row.get(v, 0) + multiplier*coef
+            if value != 0:
+                row[v] = value
+                if i is not None:
+                    self.column_rows[v].add(i)
+            elif v in row:
+                del row[v]
+                if i is not None:
+                    self.column_rows[v].discard(i)
+        # Each of these divisions is exact
+        for v in row:
+            row[v] //= old
+        return (scalar*denominator + multiplier*expression_scalar) // old
+
+    def pivot_variable(self, entering, r):
+        """Pivots the variable with id entering into the basis, in
+        place of the basic variable of row r."""
+        # Rearrange row r in terms of the entering variable, over the new
+        # denominator, negating it if needed to keep the denominator positive
+        row = self.rows[r]
+        pivot = row.pop(entering)
+        sign = -1 if pivot > 0 else 1
+        leaving = self.basic[r]
+        expression = {v: sign*coef for v, coef in row.items()}
+        expression[leaving] = -sign*self.denominator
+        expression_scalar = sign*self.scalar[r]
+        denominator = abs(pivot)
+        self.rows[r] = expression
+        self.scalar[r] = expression_scalar
+        self.basic[r] = entering
+        self.column_rows[leaving].add(r)
+        self.column_rows.pop(entering, None)
+        # Every other row changes, since the denominator changes
+        for i in range(self.m):
+            if i != r:
+                self.scalar[i] = self.update_row(self.rows[i], self.scalar[i], expression,
+                                                 expression_scalar, entering, denominator, i)
+        self.obj_scalar = self.update_row(self.obj, self.obj_scalar, expression,
+                                          expression_scalar, entering, denominator)
+        self.denominator = denominator
+        # Every value is over the shared denominator
+        self.record_pivot(entering, leaving, denominator)
+
+    def objective_value(self):
+        return Fraction(self.obj_scalar, self.denominator*self.obj_scale)
+
+    def dense(self):
+        """Same as SimplexDictionary.dense(), undoing the scaling of
+        the slack variables and the shared denominator."""
+        basic, nonbasic, coefs, scalars, objective = super().dense()
+        # Each slack variable is row_scale times the original one
+        scale = np.where(np.arange(self.n+self.m+1) > self.n, self.row_scale, 1)
+        coefs = coefs * scale[nonbasic] / scale[basic][:, None] / self.denominator
+        scalars = scalars / scale[basic] / self.denominator
+        objective = objective * scale[nonbasic] / (self.denominator*self.obj_scale)
+        return basic, nonbasic, coefs, scalars, objective
+
+    def coordinates(self):
+        """Returns the values of the optimization variables in the
+        same format as SimplexDictionary.coordinates()."""
+        coords = [(i+1, 0) for i in range(self.n)]
+        for row, var in enumerate(self.basic):
+            if var < self.n:
+                coords[var] = (var+1, Fraction(self.scalar[row], self.denominator))
+        return coords
+
+    def convert(self):
+        """Returns a new IntegerDictionary object which represents
+        the dictionary of the auxiliary LP after it has been trans-
+        formed to represent the original (now feasible) problem."""
+        feasible_lp = copy(self)
+        feasible_lp.basic = list(self.basic)
+        feasible_lp.scalar = list(self.scalar)
+        feasible_lp.rows = [dict(row) for row in self.rows]
+        feasible_lp.obj = dict(self.obj)
+        feasible_lp.index_columns()
+        # A degenerate omega still in the basis is pivoted out first,
+        # otherwise its constraint is redundant and omega stays 0
+        if self.omega_index in feasible_lp.basic:
+            row = feasible_lp.basic.index(self.omega_index)
+            if feasible_lp.rows[row]:
+                feasible_lp.pivot_variable(min(feasible_lp.rows[row]), row)
+        # Remove omega column
+        for i in feasible_lp.column_rows.pop(self.omega_index, ()):
+            del feasible_lp.rows[i][self.omega_index]
+        # Redefine original objective function over the current denominator
+        original_obj, original_scalar, feasible_lp.obj_scale = self.original_obj
+        obj = defaultdict(int)
+        feasible_lp.obj_scalar = original_scalar*feasible_lp.denominator
+        for v, coef in original_obj.items():
+            if v in feasible_lp.basic:
+                i = feasible_lp.basic.index(v)
+                feasible_lp.obj_scalar += coef*feasible_lp.scalar[i]
+                for u, a in feasible_lp.rows[i].items():
+                    obj[u] += coef*a
+            else:
+                obj[v] += coef*feasible_lp.denominator
+        feasible_lp.obj = {v: coef for v, coef in obj.items() if coef != 0}
+        feasible_lp.original_obj = None
+        return feasible_lp
+
+    def __repr__(self):
+        return f"Denominator: {self.denominator}\n" + super().__repr__()
+
+
+class MixedPrecision(BaseDictionary):
+    """Finds the optimal basis with the floating point arithmetic of
+    RevisedSimplex, then rebuilds the dictionary of that basis once with
+    the exact arithmetic of SparseDictionary. The exact dictionary proves
+    that the basis is feasible and optimal, or that the LP is unbounded or
+    infeasible, and only takes pivots of its own if the floating point
+    basis turns out to be wrong. All results come from the exact
+    dictionary, so the output is that of an exact engine."""
+
+    def __init__(self, objective, constraints, rule):
+        self.approximate = RevisedSimplex(objective, constraints, rule)
+        self.exact = SparseDictionary(objective, constraints, sparse_blands_rule)
+
+    @property
+    def pivots(self):
+        return self.approximate.pivots + self.exact.pivots
+
+    def subscribe(self, callback):
+        """Same as BaseDictionary.subscribe(), for the pivots of both
+        dictionaries."""
+        self.approximate.subscribe(callback)
+        self.exact.subscribe(callback)
+
+    def counters(self):
+        """Returns the counters of both dictionaries, added up."""
+        approximate, exact = self.approximate.counters(), self.exact.counters()
+        counters = {name: approximate[name] + exact[name] for name in approximate}
+        counters["denominator_bits"] = exact["denominator_bits"]
+        return counters
+
+    def synchronize(self):
+        """Moves the floating point dictionary to the basis of the
+        exact one."""
+        exact = self.exact
+        basic = np.array(exact.basic, dtype=int)
+        nonbasic = np.setdiff1d(np.arange(exact.n+exact.m+1), basic)
+        if exact.original_obj is None:
+            nonbasic = nonbasic[nonbasic != exact.omega_index]
+        self.approximate.basic = basic
+        self.approximate.nonbasic = nonbasic
+        self.approximate.refactor()
+
+    def get_auxiliary_lp(self):
+        """Returns a new MixedPrecision object which represents
+        the auxiliary LP, after its initial pivot has been performed
+        to make it feasible."""
+        auxiliary_lp = copy(self)
+        auxiliary_lp.exact = self.exact.get_auxiliary_lp()
+        auxiliary_lp.approximate = self.approximate.get_auxiliary_lp()
+        auxiliary_lp.synchronize()
+        return auxiliary_lp
+
+    def is_feasible(self):
+        return self.exact.is_feasible()
+
+    def is_unbounded(self):
+        return self.exact.is_unbounded()
+
+    def is_optimal(self):
+        return self.exact.is_optimal()
+
+    def can_start_dual(self):
+        return self.exact.can_start_dual()
+
+    def run(self):
+        try:
+            self.approximate.run()
+            # The exact dictionary must stay feasible, so a basis which
+            # is not is only accepted if the dual simplex method fixes it
+            candidate = self.exact.with_basis(self.approximate.basic)
+            if candidate.is_feasible() or (candidate.is_optimal() and candidate.run_dual()):
+                self.exact = candidate
+        except np.linalg.LinAlgError:
+            # The basis became singular in floating point, so the exact
+            # dictionary has to take every pivot
+            pass
+        self.exact.run()
+        self.synchronize()
+
+    def run_dual(self):
+        """Same as SimplexDictionary.run_dual()."""
+        try:
+            self.approximate.run_dual()
+            # The exact dictionary must keep an optimal objective function
+            candidate = self.exact.with_basis(self.approximate.basic)
+            if candidate.is_optimal():
+                self.exact = candidate
+        except np.linalg.LinAlgError:
+            pass
+        feasible = self.exact.run_dual()
+        self.synchronize()
+        return feasible
+
+    def dense(self):
+        return self.exact.dense()
+
+    def basis(self):
+        return self.exact.basis()
+
+    def with_basis(self, basis):
+        """Same as SimplexDictionary.with_basis()."""
+        lp = copy(self)
+        lp.exact = self.exact.with_basis(basis)
+        lp.approximate = copy(self.approximate)
+        lp.synchronize()
+        return lp
+
+    def objective_value(self):
+        return self.exact.objective_value()
+
+    def coordinates(self):
+        return self.exact.coordinates()
+
+    def convert(self):
+        """Returns a new MixedPrecision object which represents
+        the auxiliary LP after it has been transformed to represent
+        the original (now feasible) problem."""
+        feasible_lp = copy(self)
+        feasible_lp.exact = self.exact.convert()
+        feasible_lp.approximate = self.approximate.convert()
+        feasible_lp.synchronize()
+        return feasible_lp
+
+    def __repr__(self):
+        return repr(self.exact)
+
+
+# Relative accuracy at which the interior point method stops, of the
+# residuals of the constraints and of the duality gap, which is reached
+# more easily and decides the digits of the objective value, and the
+# largest number of iterations before it gives up
+INTERIOR_TOLERANCE = 1e-8
+GAP_TOLERANCE = 1e-11
+INTERIOR_ITERATIONS = 200
+
+# Number of iterations without progress, once the complementarity gap
+# has vanished, after which rounding errors are assumed to prevent any
+# further progress, and the factor by which the best solution may then
+# miss the tolerances and still be accepted
+STALL_ITERATIONS = 5
+STALL_ACCEPTANCE = 100
+
+# Fraction of the distance to the boundary taken by each step
+STEP_FRACTION = 0.99
+
+
+# Number of steps of iterative refinement of each normal equations solve
+REFINEMENT_STEPS = 2
+
+
+def normal_solve(matrix, factor, rhs):
+    """Solves matrix x = rhs given the function returned by normal_factor()
+    for the matrix, possibly shifted. The solution is refined against the
+    matrix itself, which recovers the accuracy lost to the shift and to
+    rounding as the matrix becomes ill-conditioned near the optimum."""
+    solution = factor(rhs)
+    for _ in range(REFINEMENT_STEPS):
+        solution += factor(rhs - matrix @ solution)
+    return solution
+
+
+def step_length(values, changes):
+    """Returns the largest step, at most 1, along the changes which
+    keeps the values nonnegative."""
+    shrinking = changes < 0
+    return min(1.0, np.min(-values[shrinking] / changes[shrinking], initial=np.inf))
+
+
+def normal_factor(matrix):
+    """Factorizes a normal equations matrix A Θ A^T as L L^T by Cholesky,
+    adding a growing multiple of the identity to its diagonal if the
+    matrix is not numerically positive definite, as happens near the
+    optimum. Returns a function which solves L L^T x = rhs.
+
+    With SciPy, LAPACK solves with L itself. NumPy has no triangular
+    solve, so L is inverted instead, which costs about as much as the
+    factorization. That happens once per iteration, for the nine solves
+    of the three calls of normal_solve() which each become two products,
+    and the refinement against the unfactored matrix corrects the
+    rounding of the inverse."""
+    size = len(matrix)
+    shift = 1e-14 * (np.max(np.diag(matrix), initial=0) + 1)
+    while True:
+        try:
+            if scipy is not None:
+                factor = scipy.linalg.cho_factor(matrix + shift*np.eye(size), lower=True, check_finite=False)
+                return lambda rhs: scipy.linalg.cho_solve(factor, rhs, check_finite=False)
+            inverse = np.linalg.inv(np.linalg.cholesky(matrix + shift*np.eye(size)))
+            return lambda rhs: inverse.T @ (inverse @ rhs)
+        except np.linalg.LinAlgError:
+            shift *= 100
+
+
+class InteriorPoint(BaseDictionary):
+    """Solves the LP with a primal-dual interior point method instead of
+    pivoting. Every iteration solves the normal equations A Θ A^T with a
+    Cholesky factorization, twice per Mehrotra predictor-corrector step,
+    so that the number of iterations barely grows with the size of the LP.
+    The LP is embedded in a homogeneous self-dual model, whose solution
+    is either an optimal solution or a certificate that the LP is
+    infeasible or unbounded, so no auxiliary LP is needed. With crossover,
+    the RevisedSimplex engine then moves from the interior point solution
+    to an optimal vertex, starting from the basis it suggests."""
+
+    tolerance = 1e-7
+
+    def __init__(self, objective, constraints, rule, crossover=False):
+        if np is None:
+            raise ImportError("The interior point engine requires NumPy")
+        # The simplex engine provides the constraint matrix, and the
+        # vertex for crossover or if the method fails to converge
+        self.simplex = RevisedSimplex(objective, constraints, rule)
+        self.n = self.simplex.n
+        self.m = self.simplex.m
+        self.crossover = crossover
+        # Ax + w = b as a minimization over the ids of x and w, omega left out
+        self.ids = np.concatenate([np.arange(self.n), np.arange(self.n+1, self.n+self.m+1)])
+        self.status = None
+        self.vertex = None
+        self.value = 0
+        self.iterations = 0
+        # Values of the ids, and their order from the most to the least
+        # likely to be basic
+        self.x = np.zeros(len(self.ids))
+        self.order = np.arange(len(self.ids))
+
+    @property
+    def pivots(self):
+        return self.vertex.pivots if self.vertex is not None else 0
+
+    def subscribe(self, callback):
+        """Same as BaseDictionary.subscribe(), for the pivots of the
+        crossover."""
+        self.simplex.subscribe(callback)
+
+    def counters(self):
+        """Returns the counters of the crossover, and the number of
+        iterations of the interior point method."""
+        counters = self.vertex.counters() if self.vertex is not None else super().counters()
+        return {**counters, "iterations": self.iterations}
+
+    def interior_point(self, A, b, c):
+        """Runs the homogeneous self-dual interior point method on
+        min c x, A x = b, x >= 0. Returns the status, which is None if
+        the method did not converge, and the primal values and dual
+        slacks of the solution if the LP is optimal."""
+        m, size = A.shape
+        x, s = np.ones(size), np.ones(size)
+        y = np.zeros(m)
+        tau, kappa = 1.0, 1.0
+        norm_b, norm_c = 1 + np.linalg.norm(b, np.inf), 1 + np.linalg.norm(c, np.inf)
+        best, stalled = None, 0
+        for _ in range(INTERIOR_ITERATIONS):
+            self.iterations += 1
+            # Residuals of A x = b tau, A^T y + s = c tau and b y - c x = kappa
+            rp = b*tau - A @ x
+            rd = c*tau - A.T @ y - s
+            rg = kappa + c @ x - b @ y
+            mu = (x @ s + tau*kappa) / (size + 1)
+            primal, dual = c @ x / tau, b @ y / tau
+            # Largest ratio of a relative residual to its tolerance
+            error = max(np.linalg.norm(rp, np.inf) / (norm_b * tau) / INTERIOR_TOLERANCE,
+                        np.linalg.norm(rd, np.inf) / (norm_c * tau) / INTERIOR_TOLERANCE,
+                        abs(primal - dual) / (1 + abs(primal)) / GAP_TOLERANCE)
+            if error <= 1:
+                return "optimal", x / tau, s / tau
+            if best is None or error < best[0]:
+                best, stalled = (error, x / tau, s / tau), 0
+            elif mu <= GAP_TOLERANCE:
+                stalled += 1
+                if stalled == STALL_ITERATIONS:
+                    break
+            if tau <= INTERIOR_TOLERANCE * max(1, kappa):
+                # The solution is a ray, a certificate of infeasibility of
+                # the dual if c x < 0, and otherwise of the LP if b y > 0.
+                # The dual is checked first, since run() then decides
+                # whether the LP is feasible with a certificate of its own
+                return ("dual infeasible" if c @ x < 0 else "infeasible"), None, None
+            theta = x / s
+            matrix = (A * theta) @ A.T
+            factor = normal_factor(matrix)
+            p = normal_solve(matrix, factor, b + A @ (theta*c))
+
+            def direction(eta, r_xs, r_tk):
+                # Newton direction which reduces the residuals by eta,
+                # with the complementarity targets r_xs and r_tk
+                q = normal_solve(matrix, factor, eta*rp + A @ (theta*eta*rd - r_xs/s))
+                u = theta * (A.T @ p - c)
+                v = theta * (A.T @ q - eta*rd) + r_xs/s
+                dtau = (eta*rg + c @ v - b @ q + r_tk/tau) / (b @ p - c @ u + kappa/tau)
+                dx = u*dtau + v
+                return dx, p*dtau + q, (r_xs - s*dx) / x, dtau, (r_tk - kappa*dtau) / tau
+
+            values = np.concatenate([x, s, [tau, kappa]])
+            # Predictor, the affine scaling direction
+            dx, dy, ds, dtau, dkappa = direction(1.0, -x*s, -tau*kappa)
+            alpha = step_length(values, np.concatenate([dx, ds, [dtau, dkappa]]))
+            mu_affine = ((x + alpha*dx) @ (s + alpha*ds) + (tau + alpha*dtau)*(kappa + alpha*dkappa)) / (size + 1)
+            sigma = (mu_affine / mu)**3
+            # Corrector, centered and with the second order term
+            dx, dy, ds, dtau, dkappa = direction(1 - sigma, sigma*mu - x*s - dx*ds,
+                                                 sigma*mu - tau*kappa - dtau*dkappa)
+            alpha = STEP_FRACTION * step_length(values, np.concatenate([dx, ds, [dtau, dkappa]]))
+            x, y, s = x + alpha*dx, y + alpha*dy, s + alpha*ds
+            tau, kappa = tau + alpha*dtau, kappa + alpha*dkappa
+        if best is not None and best[0] <= STALL_ACCEPTANCE:
+            return "optimal", best[1], best[2]
+        return None, None, None
+
+    def run(self):
+        # Ax + w <= b with x, w >= 0, maximizing c x
+        A = self.simplex.original.columns(self.ids)
+        b = self.simplex.rhs
+        c = -self.simplex.cost[self.ids]
+        self.status, x, s = self.interior_point(A, b, c)
+        if self.status == "dual infeasible":
+            # The LP is unbounded if it is feasible at all, which the
+            # same method decides for the zero objective function
+            feasibility, _, _ = self.interior_point(A, b, np.zeros_like(c))
+            if feasibility is None:
+                self.status = None
+            else:
+                self.status = "unbounded" if feasibility == "optimal" else "infeasible"
+        if x is not None:
+            self.value = -c @ x
+            # Variables far from their bound relative to their dual slack
+            # are basic in an optimal vertex, if it is nondegenerate
+            self.order = np.argsort(-x / s, kind="stable")
+            # Values at rounding error from zero are zero
+            x[np.abs(x) <= self.tolerance * max(1, np.max(x, initial=0))] = 0
+            self.x = x
+        with redirect_stdout(io.StringIO()):
+            if self.status is None:
+                # The method failed to converge, the simplex method decides
+                self.vertex = solve(self.simplex)
+            elif self.status == "optimal" and self.crossover:
+                self.vertex = resolve(self.simplex, self.basis())
+        if self.vertex is not None or self.status is None:
+            self.status = "infeasible" if self.vertex is None else \
+                "unbounded" if self.vertex.is_unbounded() else "optimal"
+
+    def is_feasible(self):
+        # Until it has run, the method needs nothing else to start
+        return self.status != "infeasible"
+
+    def is_unbounded(self):
+        return self.status == "unbounded"
+
+    def is_optimal(self):
+        return self.status == "optimal"
+
+    def can_start_dual(self):
+        return False
+
+    def objective_value(self):
+        if self.vertex is not None:
+            return self.vertex.objective_value()
+        return 0 if abs(self.value) < self.tolerance else self.value
+
+    def coordinates(self):
+        if self.vertex is not None:
+            return self.vertex.coordinates()
+        return [(j+1, self.x[j]) for j in range(self.n)]
+
+    def basis(self):
+        """Returns the ids of the basic variables of the vertex found by
+        crossover, or otherwise the m variables with the largest values
+        relative to their dual slacks, the basis the solution suggests."""
+        if self.vertex is not None:
+            return self.vertex.basis()
+        order = [j for j in self.order[:self.m] if self.x[j] > 0]
+        return [int(v) for v in self.ids[order]]
+
+    def with_basis(self, basis):
+        """Returns a copy of the dictionary. The interior point method
+        cannot start from a basis, so it is ignored."""
+        return copy(self)
+
+    def dense(self):
+        if self.vertex is None:
+            raise ValueError("The interior point solution is not a vertex, use crossover")
+        return self.vertex.dense()
+
+    def __repr__(self):
+        return f"Status: {self.status}\nIterations: {self.iterations}\nx: {self.x}\n"
+
+
+class Presolve:
+    """Reduces an LP in standard form before its dictionary is built,
+    and maps the solution of the smaller LP back to the original one.
+    The reductions below are applied until none of them changes the LP:
+
+    - empty rows are dropped, or prove that the LP is infeasible
+    - rows with only negative coefficients and a nonnegative right hand
+      side are dropped, and rows with only positive coefficients and a
+      zero right hand side fix all of their variables at zero
+    - singleton rows a x_j <= b with a < 0 are lower bounds on x_j,
+      which are substituted out by shifting x_j, and those with a > 0
+      are upper bounds on x_j, which fix x_j at zero if they are zero
+    - duplicate rows, which are positive multiples of each other, are
+      merged into the one with the tightest right hand side
+    - dominated columns, with a nonpositive objective coefficient and
+      no negative coefficients, are fixed at zero
+    - columns with a nonnegative objective coefficient and no positive
+      coefficients can grow to satisfy every row in which they appear,
+      so they are dropped together with those rows. If the objective
+      coefficient is positive, the LP is unbounded unless infeasible.
+      Such a column with an upper bound is fixed at its bound instead
+
+    Empty columns and columns with a zero objective coefficient are
+    covered by the last two reductions when they can be removed. The
+    upper bounds are returned by reduced() with the constraints, for the
+    dictionary engine to keep as bounds and expand() to turn back into
+    rows for the others."""
+
+    def __init__(self, objective, constraints):
+        self.n = len(objective)
+        self.objective = list(objective)
+        self.rhs = [constraint[-1] for constraint in constraints]
+        # Nonzero coefficients of the remaining LP, by row and by column
+        self.rows = {i: dict(row_items(constraint)) for i, constraint in enumerate(constraints)}
+        self.cols = {j: {} for j in range(self.n)}
+        for i, row in self.rows.items():
+            for j, a in row.items():
+                self.cols[j][i] = a
+        # Objective value of the original LP at the origin of the reduced one
+        self.constant = 0
+        self.infeasible = False
+        self.unbounded = False
+        # Upper bounds of the columns, from singleton rows
+        self.upper = {}
+        # Reductions which change the value of a variable, undone in
+        # reverse order by postsolve()
+        self.stack = []
+        changed = True
+        while changed and not self.infeasible:
+            changed = any([self.reduce_rows(), self.merge_duplicate_rows(), self.reduce_columns()])
+
+    def drop_row(self, i):
+        for j in self.rows.pop(i):
+            del self.cols[j][i]
+
+    def drop_column(self, j):
+        for i in self.cols.pop(j):
+            del self.rows[i][j]
+        self.upper.pop(j, None)
+
+    def reduce_rows(self):
+        changed = False
+        for i, row in list(self.rows.items()):
+            if not row:
+                if self.rhs[i] < 0:
+                    self.infeasible = True
+                self.drop_row(i)
+                changed = True
+            elif self.rhs[i] >= 0 and all(a < 0 for a in row.values()):
+                # Satisfied by every nonnegative point
+                self.drop_row(i)
+                changed = True
+            elif self.rhs[i] <= 0 and all(a > 0 for a in row.values()):
+                # Only satisfied if all of its variables are zero
+                if self.rhs[i] < 0:
+                    self.infeasible = True
+                for j in list(row):
+                    self.drop_column(j)
+                self.drop_row(i)
+                changed = True
+            elif len(row) == 1:
+                (j, a), = row.items()
+                if a < 0:
+                    # A positive lower bound, as the row is not redundant.
+                    # Substitute x_j = x_j' + bound, with x_j' >= 0
+                    bound = self.rhs[i] / a
+                    self.drop_row(i)
+                    for k, coef in self.cols[j].items():
+                        self.rhs[k] -= coef * bound
+                    self.constant += self.objective[j] * bound
+                    self.stack.append(("shift", j, bound))
+                    if j in self.upper:
+                        self.upper[j] -= bound
+                        if self.upper[j] < 0:
+                            self.infeasible = True
+                        elif self.upper[j] == 0:
+                            self.drop_column(j)
+                else:
+                    # A positive upper bound, as the right hand side is positive
+                    self.upper[j] = min(self.upper.get(j, inf), self.rhs[i] / a)
+                    self.drop_row(i)
+                changed = True
+        return changed
+
+    def merge_duplicate_rows(self):
+        changed = False
+        tightest = {}
+        for i, row in list(self.rows.items()):
+            if not row:
+                continue
+            # Scale each row by a positive number to compare it with the others
+            scale = abs(row[min(row)])
+            key = tuple(sorted((j, a / scale) for j, a in row.items()))
+            bound = self.rhs[i] / scale
+            if key not in tightest:
+                tightest[key] = (i, bound)
+                continue
+            k, other = tightest[key]
+            if bound < other:
+                self.drop_row(k)
+                tightest[key] = (i, bound)
+            else:
+                self.drop_row(i)
+            changed = True
+        return changed
+
+    def reduce_columns(self):
+        changed = False
+        for j, col in list(self.cols.items()):
+            if self.objective[j] <= 0 and all(a > 0 for a in col.values()):
+                self.drop_column(j)
+                changed = True
+            elif self.objective[j] >= 0 and all(a < 0 for a in col.values()) and j in self.upper:
+                # Optimal at its upper bound, which only loosens its rows
+                bound = self.upper[j]
+                for i, a in col.items():
+                    self.rhs[i] -= a * bound
+                self.constant += self.objective[j] * bound
+                self.stack.append(("shift", j, bound))
+                self.drop_column(j)
+                changed = True
+            elif self.objective[j] >= 0 and all(a < 0 for a in col.values()):
+                rows = [(self.rows[i], self.rhs[i]) for i in col]
+                self.stack.append(("grow", j, rows))
+                for i in list(col):
+                    self.drop_row(i)
+                self.drop_column(j)
+                if self.objective[j] > 0:
+                    self.unbounded = True
+                changed = True
+        return changed
+
+    def reduced(self):
+        """Returns the objective function and constraints of the reduced
+        LP, whose variables are the remaining columns in their order. The
+        constraints are BoundedConstraints if some columns have upper
+        bounds."""
+        position = {j: p for p, j in enumerate(self.cols)}
+        objective = [self.objective[j] for j in self.cols]
+        constraints = [SparseRow(len(position), {position[j]: a for j, a in row.items()}, self.rhs[i])
+                       for i, row in self.rows.items()]
+        if self.upper:
+            constraints = BoundedConstraints(constraints, len(position),
+                                             {position[j]: bound for j, bound in self.upper.items()})
+        return objective, constraints
+
+    def postsolve(self, values):
+        """Returns the values of all variables of the original LP, given
+        the values of the variables of the reduced LP."""
+        x = [0] * self.n
+        for j, value in zip(self.cols, values):
+            x[j] = value
+        for step in reversed(self.stack):
+            if step[0] == "shift":
+                _, j, bound = step
+                x[j] += bound
+            else:
+                # The smallest value which satisfies every dropped row
+                _, j, rows = step
+                x[j] = max([0] + [(sum(a * x[k] for k, a in row.items() if k != j) - b) / -row[j]
+                                  for row, b in rows])
+        return x
+
+
+class Scaling:
+    """Scales the rows and columns of an LP by powers of two, which
+    are exact in both floating point and Fraction arithmetic, so that
+    its coefficients are closer to one in magnitude. Scaling column j by
+    s_j substitutes x_j = s_j x_j', so postsolve() scales the values back.
+
+    The geometric method repeatedly divides each row and then each
+    column by the geometric mean of its smallest and largest coefficient
+    magnitudes, while that shrinks the ratio of the largest to the
+    smallest magnitude in the LP by at least a tenth, and then equilibrates.
+    Equilibration divides each row and then each column by its largest
+    coefficient magnitude."""
+
+    # Attributes shared with Presolve, which PresolvedDictionary reads
+    constant = 0
+    unbounded = False
+    infeasible = False
+
+    def __init__(self, objective, constraints, method="geometric", passes=20):
+        self.objective = objective
+        self.constraints = constraints
+        # Base 2 logarithms of the nonzero magnitudes as they are scaled
+        self.entries = [[i, j, log2(abs(a))] for i, constraint in enumerate(constraints)
+                        for j, a in row_items(constraint)]
+        self.row_logs = [0] * len(constraints)
+        self.col_logs = [0] * len(objective)
+        if method == "geometric":
+            for _ in range(passes):
+                spread = self.spread()
+                self.scale_lines(0, lambda low, high: (low+high) / 2)
+                self.scale_lines(1, lambda low, high: (low+high) / 2)
+                if self.spread() > 0.9 * spread:
+                    break
+        self.scale_lines(0, lambda low, high: high)
+        self.scale_lines(1, lambda low, high: high)
+        self.row_scale = [Fraction(2) ** k for k in self.row_logs]
+        self.col_scale = [Fraction(2) ** k for k in self.col_logs]
+
+    def spread(self):
+        """Returns the base 2 logarithm of the ratio of the largest to
+        the smallest coefficient magnitude."""
+        logs = [entry[2] for entry in self.entries]
+        return max(logs) - min(logs) if logs else 0
+
+    def scale_lines(self, key, center):
+        """Scales each row (key 0) or column (key 1) by the power of two
+        nearest to dividing it by 2 to the center of the base 2 logarithms
+        of its smallest and largest magnitudes."""
+        logs = self.row_logs if key == 0 else self.col_logs
+        low = [inf] * len(logs)
+        high = [-inf] * len(logs)
+        for entry in self.entries:
+            k = entry[key]
+            low[k] = min(low[k], entry[2])
+            high[k] = max(high[k], entry[2])
+        shift = [0 if low[k] == inf else -round(center(low[k], high[k])) for k in range(len(logs))]
+        for entry in self.entries:
+            entry[2] += shift[entry[key]]
+        for k in range(len(logs)):
+            logs[k] += shift[k]
+
+    def reduced(self):
+        """Returns the objective function and constraints of the scaled LP."""
+        n = len(self.objective)
+        objective = [c * s for c, s in zip(self.objective, self.col_scale)]
+        constraints = [SparseRow(n, {j: a * r * self.col_scale[j] for j, a in row_items(constraint)},
+                                 constraint[-1] * r)
+                       for constraint, r in zip(self.constraints, self.row_scale)]
+        return objective, constraints
+
+    def postsolve(self, values):
+        """Returns the values of the variables of the LP before scaling,
+        given the values of the variables of the scaled LP."""
+        return [value * s for value, s in zip(values, self.col_scale)]
+
+
+class StandardForm:
+    """Maps the solution of an LP brought into standard form by
+    read_mps() back to the variables of the original model. Each original
+    variable x_j is the offset of column j plus the variables of standard
+    form which replace it, each with a sign of 1 or -1."""
+
+    # Attributes shared with Presolve, which PresolvedDictionary reads
+    unbounded = False
+    infeasible = False
+
+    def __init__(self, offsets, columns, constant):
+        self.offsets = offsets
+        # Original variable and sign of each variable of standard form
+        self.columns = columns
+        self.constant = constant
+
+    def postsolve(self, values):
+        """Returns the values of the variables of the original model,
+        given the values of the variables of standard form. Floating
+        point values within EPSILON of the offset or of zero are snapped,
+        so that cancellation does not show up as noise."""
+        x = list(self.offsets)
+        for (j, sign), value in zip(self.columns, values):
+            x[j] += sign * value
+        for j, (offset, value) in enumerate(zip(self.offsets, x)):
+            if isinstance(value, float):
+                scale = EPSILON * max(1, abs(offset))
+                if abs(value - offset) <= scale:
+                    x[j] = float(offset)
+                elif abs(value) <= scale:
+                    x[j] = 0.0
+        return x
+
+
+class PresolvedDictionary(BaseDictionary):
+    """Wraps the dictionary of the LP left by a Presolve or Scaling
+    stage, and reports the solution of the LP given to the stage. If
+    presolve removed every variable, there is no dictionary, as the
+    origin of the reduced LP is its solution."""
+
+    def __init__(self, stage, inner):
+        self.presolve = stage
+        self.inner = inner
+        self.tolerance = inner.tolerance if inner else 0
+        self.constant = stage.constant
+        self.unbounded = stage.unbounded
+
+    @property
+    def pivots(self):
+        return self.inner.pivots if self.inner is not None else 0
+
+    def subscribe(self, callback):
+        if self.inner is not None:
+            self.inner.subscribe(callback)
+
+    def counters(self):
+        return self.inner.counters() if self.inner is not None else super().counters()
+
+    def get_auxiliary_lp(self):
+        """Returns a new PresolvedDictionary which represents the
+        auxiliary LP of the reduced LP."""
+        auxiliary_lp = copy(self)
+        auxiliary_lp.inner = self.inner.get_auxiliary_lp()
+        auxiliary_lp.constant = 0
+        auxiliary_lp.unbounded = False
+        return auxiliary_lp
+
+    def is_feasible(self):
+        return self.inner is None or self.inner.is_feasible()
+
+    def is_unbounded(self):
+        return self.unbounded or (self.inner is not None and self.inner.is_unbounded())
+
+    def is_optimal(self):
+        return self.inner is None or self.inner.is_optimal()
+
+    def can_start_dual(self):
+        return self.inner.can_start_dual()
+
+    def run(self):
+        # A feasible dictionary is enough to tell that the LP is unbounded
+        if self.inner is not None and not self.unbounded:
+            self.inner.run()
+
+    def run_dual(self):
+        return self.inner.run_dual()
+
+    def objective_value(self):
+        if self.inner is None:
+            return self.constant
+        return self.inner.objective_value() + self.constant
+
+    def coordinates(self):
+        values = [] if self.inner is None else [c[1] for c in self.inner.coordinates()]
+        x = self.presolve.postsolve(values)
+        if self.tolerance:
+            # The rounding error of a floating point engine, such as the
+            # interior point solution without crossover, is mapped back to
+            # values which should be zero, like the engine's own values
+            scale = self.tolerance * max([1] + [abs(value) for value in x])
+            x = [0.0 if isinstance(value, float) and abs(value) <= scale else value for value in x]
+        return list(enumerate(x, 1))
+
+    def convert(self):
+        """Returns a new PresolvedDictionary which represents the
+        reduced LP, after its auxiliary LP has been converted."""
+        feasible_lp = copy(self)
+        feasible_lp.inner = self.inner.convert()
+        feasible_lp.constant = self.presolve.constant
+        feasible_lp.unbounded = self.presolve.unbounded
+        return feasible_lp
+
+    def __repr__(self):
+        return repr(self.inner)
+
+
+ENGINES = {
+    "dictionary": SimplexDictionary,
+    "tableau": TableauDictionary,
+    "revised": RevisedSimplex,
+    "sparse": SparseDictionary,
+    "integer": IntegerDictionary,
+    "mixed": MixedPrecision,
+    "interior": InteriorPoint,
+}
+
+# Engines which only use the coefficients as floats, so that the LP
+# can be read straight into NumPy arrays for them
+FLOAT_ENGINES = {"tableau", "revised", "interior"}
+
+VECTORIZED_RULES = {
+    "bland": vectorized_blands_rule,
+    "dantzig": vectorized_dantzigs_rule,
+    "largest-increase": vectorized_largest_increase_rule,
+    "steepest-edge": vectorized_steepest_edge_rule,
+    "devex": VectorizedDevexRule,
+    "partial": VectorizedPartialPricingRule,
+}
+
+SPARSE_RULES = {
+    "bland": sparse_blands_rule,
+    "dantzig": sparse_dantzigs_rule,
+    "largest-increase": sparse_largest_increase_rule,
+    "steepest-edge": sparse_steepest_edge_rule,
+    "devex": SparseDevexRule,
+    "partial": SparsePartialPricingRule,
+}
+
+# Every engine has its own implementation of each pivot rule, which
+# understands its representation of the dictionary. Rules which keep
+# state between pivots are classes, instantiated once per LP
+RULES = {
+    "dictionary": {
+        "bland": blands_rule,
+        "dantzig": dantzigs_rule,
+        "largest-increase": largest_increase_rule,
+        "steepest-edge": steepest_edge_rule,
+        "devex": DevexRule,
+        "partial": PartialPricingRule,
+    },
+    "tableau": VECTORIZED_RULES,
+    "revised": VECTORIZED_RULES,
+    "mixed": VECTORIZED_RULES,
+    "interior": VECTORIZED_RULES,
+    "sparse": SPARSE_RULES,
+    "integer": SPARSE_RULES,
+}
+
+
+def make_rule(engine, name):
+    """Returns the pivot rule with the given name for the given engine."""
+    rule = RULES[engine][name]
+    if isinstance(rule, type):
+        return rule()
+    return rule
+
+
+class Trace:
+    """Callback for BaseDictionary.subscribe() which records every pivot,
+    so that the course of a solve can be exported as JSON."""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, entering, leaving, objective, elapsed):
+        self.records.append({"entering": entering, "leaving": leaving,
+                             "objective": float(objective), "elapsed": elapsed})
+
+    def write(self, path, stats):
+        """Writes the pivots and the statistics of the solve, as stored
+        by solve(), to the file as a JSON document."""
+        with open(path, "w") as f:
+            json.dump({"stats": stats, "pivots": self.records}, f, indent=1)
+
+
+def record_phase(stats, phase, start, dictionary=None, pivots_before=0):
+    """Stores the time since start, and the pivots the dictionary took
+    since it had taken pivots_before, as the time and pivots of the phase,
+    along with the counters of the dictionary so far. Returns the current
+    time, the start of the next phase."""
+    now = time.perf_counter()
+    stats[phase + "_time"] = now - start
+    if dictionary is not None:
+        stats[phase + "_pivots"] = dictionary.pivots - pivots_before
+        stats.update(dictionary.counters())
+    return now
+
+
+def solve(input_dictionary, stats=None):
+    """Solves the LP represented by an initial dictionary of any
+    engine, going through the auxiliary LP if it is infeasible at
+    the origin, and prints the result. Returns the final dictionary,
+    or None if the LP is infeasible. If a dict is given as stats, the
+    time and number of pivots of phase one (the auxiliary LP or the dual
+    simplex method) and phase two, the time of the report, and the
+    counters of the last dictionary are stored in it."""
+    stats = {} if stats is None else stats
+    stats.update(phase_one_time=0.0, phase_one_pivots=0, phase_two_time=0.0, phase_two_pivots=0,
+                 report_time=0.0, **input_dictionary.counters())
+    clock = time.perf_counter()
+    # Solve LP if initial dictionary is feasible
+    if input_dictionary.is_feasible():
+        before = input_dictionary.pivots
+        input_dictionary.run()
+        clock = record_phase(stats, "phase_two", clock, input_dictionary, before)
+        input_dictionary.report()
+        record_phase(stats, "report", clock)
+        return input_dictionary
+    elif input_dictionary.can_start_dual():
+        # The objective function is already optimal, so the dual simplex
+        # method can start from this dictionary without an auxiliary LP
+        before = input_dictionary.pivots
+        feasible = input_dictionary.run_dual()
+        clock = record_phase(stats, "phase_one", clock, input_dictionary, before)
+        if feasible:
+            before = input_dictionary.pivots
+            input_dictionary.run()
+            clock = record_phase(stats, "phase_two", clock, input_dictionary, before)
+            input_dictionary.report()
+            record_phase(stats, "report", clock)
+            return input_dictionary
+        print("infeasible")
+    else:
+        # Construct and solve the auxiliary LP
+        auxiliary_lp = input_dictionary.get_auxiliary_lp()
+        before = auxiliary_lp.pivots
+        auxiliary_lp.run()
+        clock = record_phase(stats, "phase_one", clock, auxiliary_lp, before)
+        # If auxiliary LP is unbounded, or has nonzero objective value
+        # Then original LP is infeasible
+        if auxiliary_lp.is_unbounded():
+            print("infeasible")
+        elif abs(auxiliary_lp.objective_value()) > auxiliary_lp.tolerance:
+            print("infeasible")
+        else:
+            # Otherwise, convert to an initially feasible dictionary and solve
+            feasible_dictionary = auxiliary_lp.convert()
+            before = feasible_dictionary.pivots
+            feasible_dictionary.run()
+            clock = record_phase(stats, "phase_two", clock, feasible_dictionary, before)
+            feasible_dictionary.report()
+            record_phase(stats, "report", clock)
+            return feasible_dictionary
+    return None
+
+
+def resolve(input_dictionary, basis):
+    """Same as solve(), but starts from the given basis, exported with
+    basis() from the final dictionary of an LP with the same constraint
+    coefficients. If only the objective function changed, the basis is
+    still feasible and the simplex method continues from it. If only the
+    right hand side changed, its objective function is still optimal and
+    the dual simplex method continues from it instead. Otherwise the LP
+    is solved from scratch."""
+    dictionary = input_dictionary.with_basis(basis)
+    if dictionary.is_feasible():
+        dictionary.run()
+        dictionary.report()
+        return dictionary
+    elif dictionary.is_optimal():
+        if dictionary.run_dual():
+            dictionary.run()
+            dictionary.report()
+            return dictionary
+        print("infeasible")
+        return None
+    return solve(input_dictionary)
+
+
+# Smallest magnitude of a pivot of the crash, relative to the largest
+# coefficient of its column, which keeps the crash basis well conditioned
+CRASH_PIVOT_TOLERANCE = 0.01
+
+
+def crash_basis(objective, constraints):
+    """Returns the ids of the basic variables of a triangular crash basis,
+    to be given to with_basis() instead of starting phase one from the
+    slack variables. The rows are visited in turn, those whose slack
+    variable is negative first and then those with the fewest candidate
+    columns, and one column of the row becomes basic in place of its slack
+    variable. The other columns of the row are no longer candidates, so
+    the basis stays lower triangular and the values of its variables
+    follow by substitution. A column is only chosen if its value is
+    nonnegative and the other slack variables become no more infeasible,
+    or, for a row which is infeasible, if the total infeasibility drops.
+    In a feasible row it must not decrease the objective function."""
+    n, m = len(objective), len(constraints)
+    rows = [{j: float(a) for j, a in row_items(constraint)} for constraint in constraints]
+    residual = [float(constraint[-1]) for constraint in constraints]
+    columns = [{} for _ in range(n)]
+    for i, row in enumerate(rows):
+        for j, a in row.items():
+            columns[j][i] = a
+    largest = [max(map(abs, column.values()), default=0) for column in columns]
+    candidate = [True]*n
+    count = [len(row) for row in rows]
+    slack = [True]*m
+    # Rows without an acceptable column, until their slack variable changes
+    failed = [False]*m
+    key = lambda i: (residual[i] >= -EPSILON, count[i], i)
+    heap = [key(i) for i in range(m) if count[i]]
+    heapq.heapify(heap)
+    basis = []
+    while heap:
+        entry = heapq.heappop(heap)
+        r = entry[-1]
+        # Rows are pushed again whenever their key changes
+        if not slack[r] or failed[r] or not count[r] or entry != key(r):
+            continue
+        feasible = residual[r] >= -EPSILON
+        best, best_key = None, None
+        for j, a in rows[r].items():
+            if not candidate[j] or abs(a) < CRASH_PIVOT_TOLERANCE*largest[j]:
+                continue
+            value = max(residual[r], 0)/a if feasible else residual[r]/a
+            if value < 0 or (feasible and objective[j]*value < 0):
+                continue
+            damage = 0.0
+            for i, b in columns[j].items():
+                if slack[i] and i != r:
+                    damage += max(0, b*value - residual[i]) - max(0, -residual[i])
+            if damage > EPSILON if feasible else damage >= -residual[r]:
+                continue
+            choice = (damage, objective[j] <= 0, -abs(a)/largest[j])
+            if best is None or choice < best_key:
+                best, best_key = (j, value), choice
+        if best is None:
+            failed[r] = True
+            continue
+        j, value = best
+        basis.append(j)
+        slack[r] = False
+        for i, b in columns[j].items():
+            if slack[i]:
+                residual[i] -= b*value
+                failed[i] = False
+                heapq.heappush(heap, key(i))
+        for k in rows[r]:
+            if candidate[k]:
+                candidate[k] = False
+                for i in columns[k]:
+                    if slack[i]:
+                        count[i] -= 1
+                        if not failed[i]:
+                            heapq.heappush(heap, key(i))
+    return basis + [n+1+i for i in range(m) if slack[i]]
+
+
+def sensitivity(dictionary, n):
+    """Computes the sensitivity analysis of an optimal dictionary of an
+    LP with n optimization variables, in one vectorized pass. Returns the
+    reduced costs of the optimization variables, the dual values of the
+    constraints, and the allowable decrease and increase of each objective
+    coefficient and of each right hand side which keep the basis optimal."""
+    if np is None:
+        raise ImportError("Sensitivity analysis requires NumPy")
+    basic, nonbasic, coefs, scalars, objective = dictionary.dense()
+    m = len(basic)
+    inf = np.inf
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Ratios of the objective coefficients to every coefficient of
+        # each row, and of the scalars to every coefficient of each column
+        cost_ratios = -objective[None, :] / coefs
+        rhs_ratios = scalars[:, None] / coefs
+    reduced_costs = np.zeros(n)
+    duals = np.zeros(m)
+    cost_range = np.zeros((n, 2))
+    rhs_range = np.zeros((m, 2))
+    for j, v in enumerate(nonbasic):
+        if v < n:
+            reduced_costs[v] = objective[j]
+            cost_range[v] = (inf, -objective[j])
+        elif v > n:
+            duals[v-n-1] = -objective[j]
+            # The basis stays feasible while every scalar stays positive
+            column = rhs_ratios[:, j]
+            rhs_range[v-n-1] = (-np.max(column, where=coefs[:, j] < 0, initial=-inf),
+                                np.min(column, where=coefs[:, j] > 0, initial=inf))
+    for i, v in enumerate(basic):
+        if v < n:
+            # The basis stays optimal while every objective coefficient
+            # stays nonpositive
+            row = cost_ratios[i]
+            cost_range[v] = (-np.max(row, where=coefs[i] < 0, initial=-inf),
+                             np.min(row, where=coefs[i] > 0, initial=inf))
+        elif v > n:
+            rhs_range[v-n-1] = (scalars[i], inf)
+    return reduced_costs, duals, cost_range, rhs_range
+
+
+def report_sensitivity(dictionary, objective, constraints):
+    """Prints the sensitivity analysis of an optimal dictionary, with
+    the ranges as intervals of the original coefficients."""
+    n = len(objective)
+    reduced_costs, duals, cost_range, rhs_range = sensitivity(dictionary, n)
+    rhs = [constraint[-1] for constraint in constraints]
+    interval = lambda value, low, high: f"[{float(value)-low:.7g}, {float(value)+high:.7g}]"
+    print("variable reduced_cost objective_range")
+    for j in range(n):
+        print(f"x_{j+1} {reduced_costs[j]+0:.7g} {interval(objective[j], *cost_range[j])}")
+    print("constraint dual_value rhs_range")
+    for i in range(len(constraints)):
+        print(f"w_{i+1} {duals[i]+0:.7g} {interval(rhs[i], *rhs_range[i])}")
+
+
+def read_lp(text, exact=True):
+    """Parses the encoding of an LP, returning its objective function
+    and constraints. Every distinct token is converted only once, to the
+    exact Fraction of its decimal value, or to a float if exact is False,
+    in which case the objective function and constraints are NumPy arrays.
+    Raises ValueError if a constraint does not have one more coefficient
+    than the objective function."""
+    rows = [line.split() for line in text.splitlines()]
+    rows = [tokens for tokens in rows if tokens]
+    if not rows:
+        raise ValueError("the LP has no objective function")
+    n = len(rows[0])
+    for i, tokens in enumerate(rows[1:], 1):
+        if len(tokens) != n+1:
+            raise ValueError(f"constraint {i} has {len(tokens)} coefficients, expected {n+1}")
+    tokens = [token for tokens in rows for token in tokens]
+
+    if not exact:
+        values = np.array(tokens, dtype=float)
+        return values[:n], values[n:].reshape(len(rows)-1, n+1)
+
+    # Coefficients repeat a lot, zero above all
+    fractions = {token: Fraction(token) for token in set(tokens)}
+    values = [fractions[token] for token in tokens]
+    objective = values[:n]
+    constraints = [values[k:k+n+1] for k in range(n, len(values), n+1)]
+    return objective, constraints
+
+
+def standardize(cost, rows, lower, upper, zero, sense=1, constant=0):
+    """Brings an LP maximizing (or minimizing if sense is -1) cost x plus
+    the constant, with rows low <= a x <= high given as the dict a and
+    the two bounds, and with lower <= x <= upper, into standard form.
+    Each variable is shifted to a lower bound of zero, or negated if it
+    only has an upper bound, and each free variable is split in two. A
+    row with a finite high bound becomes a x <= high, and one with only
+    a low bound becomes -a x <= -low. The remaining upper bounds of the
+    variables, and high - low of the rows with both, are kept as upper
+    bounds by BoundedConstraints.expand().
+
+    Returns the objective function, the BoundedConstraints as SparseRows,
+    and the StandardForm which maps the solution back. Values have the
+    type of zero."""
+    n = len(cost)
+    offsets = [zero] * n
+    columns = []
+    replaced = [[] for _ in range(n)]
+    bounds = {}
+    for j in range(n):
+        if lower[j] > -inf:
+            offsets[j] = lower[j]
+            replaced[j].append((len(columns), 1))
+            columns.append((j, 1))
+            if upper[j] < inf:
+                bounds[len(columns)-1] = upper[j] - lower[j]
+        elif upper[j] < inf:
+            offsets[j] = upper[j]
+            replaced[j].append((len(columns), -1))
+            columns.append((j, -1))
+        else:
+            replaced[j].extend([(len(columns), 1), (len(columns)+1, -1)])
+            columns.extend([(j, 1), (j, -1)])
+    size = len(columns)
+
+    objective = [zero] * size
+    for j in range(n):
+        for k, sign in replaced[j]:
+            objective[k] = sense * sign * cost[j]
+    constant = sense * (sum(cost[j] * offsets[j] for j in range(n) if offsets[j]) + constant)
+
+    constraints = []
+    for row, low, high in rows:
+        coefs = {}
+        shift = zero
+        for j, a in row.items():
+            shift += a * offsets[j]
+            for k, sign in replaced[j]:
+                coefs[k] = sign * a
+        if high < inf:
+            if low > -inf:
+                bounds[size+1+len(constraints)] = high - low
+            constraints.append(SparseRow(size, coefs, high - shift))
+        elif low > -inf:
+            constraints.append(SparseRow(size, {k: -a for k, a in coefs.items()}, shift - low))
+    return objective, BoundedConstraints(constraints, size, bounds), StandardForm(offsets, columns, constant)
+
+
+# Relations of the rows of the text format, by the bounds they give
+RELATIONS = {"<=": (False, True), ">=": (True, False), "=": (True, True)}
+
+
+def read_text(text, exact=True):
+    """Parses an LP in the text format, like read_lp(), where a row may
+    also end with a relation, as in a_1 ... a_n >= b, with <=, >= or =,
+    or be ranged, as in l <= a_1 ... a_n <= u. The lines lower l_1 ...
+    l_n and upper u_1 ... u_n give the bounds of the variables, which
+    are 0 and inf by default, and may be -inf or inf.
+
+    An LP which uses neither is read by read_lp(), with no stages.
+    Otherwise it is brought into standard form by standardize(), and the
+    objective function, the BoundedConstraints and a list of the
+    StandardForm are returned. Raises ValueError if a row or bound line
+    does not have one value for each variable."""
+    if "=" not in text and "lower" not in text and "upper" not in text:
+        return *read_lp(text, exact), []
+    numbers = {}
+    number = lambda token: numbers.setdefault(
+        token, float(token) if "inf" in token else Fraction(token) if exact else float(token))
+    zero = number("0")
+    lines = [line.split() for line in text.splitlines()]
+    lines = [tokens for tokens in lines if tokens]
+    if not lines:
+        raise ValueError("the LP has no objective function")
+    cost = [number(token) for token in lines[0]]
+    n = len(cost)
+    bounds = {"lower": [zero] * n, "upper": [inf] * n}
+    rows = []
+    for tokens in lines[1:]:
+        if tokens[0] in bounds:
+            if len(tokens) != n+1:
+                raise ValueError(f"{tokens[0]} has {len(tokens)-1} bounds, expected {n}")
+            bounds[tokens[0]] = [number(token) for token in tokens[1:]]
+            continue
+        low, high = -inf, inf
+        if len(tokens) > 4 and tokens[1] == "<=" and tokens[-2] == "<=":
+            low, high = number(tokens[0]), number(tokens[-1])
+            tokens = tokens[2:-2]
+        elif len(tokens) > 1 and tokens[-2] in RELATIONS:
+            has_low, has_high = RELATIONS[tokens[-2]]
+            bound = number(tokens[-1])
+            low, high = (bound if has_low else -inf), (bound if has_high else inf)
+            tokens = tokens[:-2]
+        else:
+            high = number(tokens[-1])
+            tokens = tokens[:-1]
+        if len(tokens) != n:
+            raise ValueError(f"constraint {len(rows)+1} has {len(tokens)} coefficients, expected {n}")
+        coefs = {j: number(token) for j, token in enumerate(tokens) if number(token) != 0}
+        rows.append((coefs, low, high))
+    objective, constraints, standard_form = standardize(cost, rows, bounds["lower"], bounds["upper"], zero)
+    return objective, constraints, [standard_form]
+
+
+# Columns of the six fields of a line of fixed format MPS
+MPS_FIELDS = [(1, 3), (4, 12), (14, 22), (24, 36), (39, 47), (49, 61)]
+
+
+def read_mps(lines, fixed=False, exact=True):
+    """Reads an LP in MPS format from an iterable of lines, one line at a
+    time, in free format or in fixed format if fixed is True. Rows may be
+    N, L, G or E rows, with RANGES, and columns may have any BOUNDS.
+
+    The LP is brought into standard form by standardize(), where a
+    minimization maximizes the negated objective function. E and ranged
+    rows become ranged rows, which like the upper bounds of the variables
+    expand() turns into two rows and into rows of their own, as in the
+    netlib files of the text format. Returns the objective function, the
+    BoundedConstraints, and the StandardForm which maps the solution back.
+    Values are exact Fractions, or floats if exact is False."""
+    numbers = {}
+    number = lambda token: numbers.setdefault(token, Fraction(token) if exact else float(token))
+    zero, one = number("0"), number("1")
+    section = None
+    sense = -1
+    objective_row = None
+    row_index = {}
+    row_types = []
+    row_coefs = []
+    rhs = []
+    ranges = {}
+    col_index = {}
+    cost = []
+    lower = []
+    upper = []
+    # Columns given a lower bound in the BOUNDS section
+    bounded_below = set()
+    objective_rhs = zero
+    for line in lines:
+        if not line.strip() or line.startswith("*"):
+            continue
+        if not line[0].isspace():
+            # Section header, which may carry a value on the same line
+            tokens = line.split()
+            section = tokens[0]
+            if section == "OBJSENSE" and len(tokens) > 1:
+                sense = 1 if tokens[1].startswith("MAX") else -1
+            if section == "ENDATA":
+                break
+            continue
+        if fixed:
+            fields = [line[start:end].strip() for start, end in MPS_FIELDS]
+            if section == "BOUNDS":
+                # The name of the bound vector may be blank
+                tokens = [field for field in fields[:4] if field]
+                if not fields[1]:
+                    tokens.insert(1, "")
+            else:
+                tokens = [field for field in fields[section in ("COLUMNS", "RHS", "RANGES"):] if field]
+        else:
+            tokens = line.split()
+
+        if section == "OBJSENSE":
+            sense = 1 if tokens[0].startswith("MAX") else -1
+        elif section == "ROWS":
+            kind, name = tokens[0].upper(), tokens[1]
+            if kind == "N":
+                # Only the first N row is the objective function, the others are free rows
+                if objective_row is None:
+                    objective_row = name
+            else:
+                row_index[name] = len(row_types)
+                row_types.append(kind)
+                row_coefs.append({})
+                rhs.append(zero)
+        elif section == "COLUMNS":
+            if "'MARKER'" in tokens:
+                continue
+            name = tokens[0]
+            if name not in col_index:
+                col_index[name] = len(cost)
+                cost.append(zero)
+                lower.append(zero)
+                upper.append(inf)
+            j = col_index[name]
+            for row, value in zip(tokens[1::2], tokens[2::2]):
+                if row == objective_row:
+                    cost[j] = number(value)
+                elif row in row_index and number(value) != 0:
+                    row_coefs[row_index[row]][j] = number(value)
+        elif section in ("RHS", "RANGES"):
+            # The name of the RHS or RANGES vector is optional in free format
+            pairs = tokens[1:] if len(tokens) % 2 else tokens
+            for row, value in zip(pairs[0::2], pairs[1::2]):
+                if row == objective_row:
+                    objective_rhs = number(value)
+                elif row in row_index and section == "RHS":
+                    rhs[row_index[row]] = number(value)
+                elif row in row_index:
+                    ranges[row_index[row]] = number(value)
+        elif section == "BOUNDS":
+            kind, j = tokens[0].upper(), col_index[tokens[2]]
+            value = number(tokens[3]) if len(tokens) > 3 else zero
+            if kind in ("UP", "UI"):
+                upper[j] = value
+                # A negative upper bound alone makes the lower bound -inf
+                if value < 0 and j not in bounded_below:
+                    lower[j] = -inf
+            elif kind in ("LO", "LI"):
+                lower[j] = value
+                bounded_below.add(j)
+            elif kind == "FX":
+                lower[j] = upper[j] = value
+            elif kind == "FR":
+                lower[j], upper[j] = -inf, inf
+            elif kind == "MI":
+                lower[j] = -inf
+            elif kind == "PL":
+                upper[j] = inf
+            elif kind == "BV":
+                lower[j], upper[j] = zero, one
+
+    rows = []
+    for i, kind in enumerate(row_types):
+        r = ranges.get(i)
+        if kind == "E" and not r:
+            low = high = rhs[i]
+        elif kind == "E":
+            low, high = (rhs[i], rhs[i] + r) if r > 0 else (rhs[i] + r, rhs[i])
+        elif kind == "L":
+            low, high = (rhs[i] - abs(r) if r else -inf), rhs[i]
+        else:
+            low, high = rhs[i], (rhs[i] + abs(r) if r else inf)
+        rows.append((row_coefs[i], low, high))
+    return standardize(cost, rows, lower, upper, zero, sense, -objective_rhs)
+
+
+# First bytes of a binary LP file, followed by the length of its header
+BINARY_MAGIC = b"LPSOLVE\x01"
+
+
+def rationals(values):
+    """Returns the positions, numerators and denominators of the Fractions
+    which are not the nearest simple Fraction to their float, as int64
+    arrays, or None if the values are not all Fractions or one of them
+    does not fit. Decimal values, as in the netlib files, have none."""
+    if not all(isinstance(value, Fraction) for value in values):
+        return None
+    positions = [k for k, value in enumerate(values)
+                 if Fraction(float(value)).limit_denominator() != value]
+    numerators = [values[k].numerator for k in positions]
+    denominators = [values[k].denominator for k in positions]
+    if any(abs(p) >= 2**63 for p in numerators) or any(q >= 2**63 for q in denominators):
+        return None
+    return positions, numerators, denominators
+
+
+def write_binary(path, objective, constraints, stages=()):
+    """Writes an LP to a binary file: a JSON header which names each
+    array with its type, offset and length, followed by the contiguous
+    little endian arrays, aligned to 8 bytes so that read_binary() can
+    memory-map them. The constraints are stored in CSR form. An exact value
+    which read_binary() would not get back from its float64 as the nearest
+    simple Fraction is also stored, by position, as an int64 numerator
+    and denominator.
+    The StandardForm of an LP read from MPS is stored as well, and its
+    bounds and ranged rows are expanded into rows."""
+    if np is None:
+        raise ImportError("The binary format requires NumPy")
+    if getattr(constraints, "upper", None):
+        constraints = constraints.expand()
+    rows = [list(row_items(constraint)) for constraint in constraints]
+    arrays = {
+        "objective": list(objective),
+        "rhs": [constraint[-1] for constraint in constraints],
+        "indptr": np.cumsum([0] + [len(row) for row in rows]),
+        "indices": [j for row in rows for j, _ in row],
+        "data": [a for row in rows for _, a in row],
+    }
+    header = {"n": len(objective), "arrays": {}, "constant": None}
+    if stages:
+        standard_form, = stages
+        arrays["offsets"] = standard_form.offsets
+        arrays["column_variables"] = [j for j, _ in standard_form.columns]
+        arrays["column_signs"] = [sign for _, sign in standard_form.columns]
+        header["constant"] = str(standard_form.constant)
+    for name in ("objective", "rhs", "data", "offsets"):
+        exact = rationals(arrays[name]) if name in arrays else None
+        if exact is not None and exact[0]:
+            arrays[name + "_positions"], arrays[name + "_numerators"], arrays[name + "_denominators"] = exact
+
+    blobs = []
+    offset = 0
+    for name, values in arrays.items():
+        dtype = np.int64 if name in ("indptr", "indices", "column_variables", "column_signs") \
+            or name.endswith(("_positions", "_numerators", "_denominators")) else np.float64
+        if name == "indices" and len(objective) < 2**31:
+            # Column indices take half the space of int64 on all but huge LPs
+            dtype = np.int32
+        array = np.asarray(np.array(values, dtype=float) if dtype is np.float64 else values,
+                           dtype=np.dtype(dtype).newbyteorder("<"))
+        header["arrays"][name] = [array.dtype.str, offset, len(array)]
+        padding = -array.nbytes % 8
+        blobs.append(array.tobytes() + b"\0" * padding)
+        offset += array.nbytes + padding
+    text = json.dumps(header).encode()
+    text += b" " * (-(len(BINARY_MAGIC) + 8 + len(text)) % 8)
+    with open(path, "wb") as f:
+        f.write(BINARY_MAGIC)
+        f.write(len(text).to_bytes(8, "little"))
+        f.write(text)
+        for blob in blobs:
+            f.write(blob)
+
+
+def read_binary(source, exact=True):
+    """Reads an LP written by write_binary() from a path, which is
+    memory-mapped, or from the bytes of the file. Returns the objective
+    function, the constraints as SparseConstraints, and the stages which
+    map the solution back, like read_input(). The objective function is
+    a float array, unless exact is True."""
+    if np is None:
+        raise ImportError("The binary format requires NumPy")
+    if isinstance(source, str):
+        raw = np.memmap(source, dtype=np.uint8, mode="r")
+    else:
+        raw = np.frombuffer(source, dtype=np.uint8)
+    start = len(BINARY_MAGIC) + 8
+    if raw[:len(BINARY_MAGIC)].tobytes() != BINARY_MAGIC:
+        raise ValueError("not a binary LP file")
+    length = int.from_bytes(raw[len(BINARY_MAGIC):start].tobytes(), "little")
+    header = json.loads(raw[start:start+length].tobytes())
+    start += length
+    arrays = {}
+    for name, (dtype, offset, count) in header["arrays"].items():
+        dtype = np.dtype(dtype)
+        arrays[name] = raw[start+offset:start+offset+count*dtype.itemsize].view(dtype)
+
+    def exceptions(name):
+        # The exact values which are not the nearest simple Fraction to their
+        # float, or every value in files which stored all of them
+        if name + "_numerators" not in arrays:
+            return {}
+        numerators = arrays[name + "_numerators"].tolist()
+        positions = arrays[name + "_positions"].tolist() if name + "_positions" in arrays \
+            else range(len(numerators))
+        return {k: Fraction(p, q) for k, p, q in zip(positions, numerators,
+                                                      arrays[name + "_denominators"].tolist())}
+
+    def values(name):
+        if not exact:
+            return arrays[name]
+        fractions = exceptions(name)
+        return [fractions[k] if k in fractions else Fraction(v).limit_denominator()
+                for k, v in enumerate(arrays[name].tolist())]
+
+    exact_data = (exceptions("data"), exceptions("rhs")) if exact else None
+    constraints = SparseConstraints(header["n"], arrays["indptr"], arrays["indices"], arrays["data"],
+                                    arrays["rhs"], exact_data, exact)
+    stages = []
+    if "offsets" in arrays:
+        columns = list(zip(arrays["column_variables"].tolist(), arrays["column_signs"].tolist()))
+        constant = Fraction(header["constant"]) if exact else float(Fraction(header["constant"]))
+        stages.append(StandardForm(list(values("offsets")), columns, constant))
+    return values("objective"), constraints, stages
+
+
+def detect_format(head):
+    """Returns the format of an LP, given the first bytes of its file."""
+    if head.startswith(BINARY_MAGIC):
+        return "binary"
+    for line in head.decode(errors="replace").splitlines():
+        if line.strip() and not line.startswith("*"):
+            return "mps" if line.split()[0] in ("NAME", "ROWS", "OBJSENSE") else "text"
+    return "text"
+
+
+def read_input(stream, args, path=None):
+    """Reads an LP from a binary stream in the format chosen on the
+    command line, or detected from its first bytes. A binary LP is
+    memory-mapped if the path of its file is given. Returns the objective
+    function, the constraints, and the stages which map the solution
+    back to the variables of the input."""
+    fmt = args.format
+    if fmt == "auto":
+        fmt = detect_format(stream.peek(4096))
+    if fmt == "binary":
+        return read_binary(path if path is not None else stream.read(), exact_input(args))
+    text = io.TextIOWrapper(stream)
+    if fmt == "text":
+        return read_text(text.read(), exact_input(args))
+    objective, constraints, standard_form = read_mps(text, fmt == "fixed-mps", exact_input(args))
+    return objective, constraints, [standard_form]
+
+
+def exact_input(args):
+    """Returns whether the LP has to be read as Fractions for the options
+    on the command line, rather than as floats for a floating point engine,
+    or for every engine of the portfolio."""
+    engines = [args.engine]
+    if getattr(args, "portfolio", None):
+        engines = [engine for engine, _, _ in portfolio_configurations(args.portfolio)]
+    return (any(engine not in FLOAT_ENGINES for engine in engines) or args.presolve
+            or args.scaling is not None or args.convert is not None)
+
+
+def split_stream(text, delimiter):
+    """Splits a stream of LP encodings on the lines equal to the
+    delimiter, dropping empty pieces."""
+    pieces = [[]]
+    for line in text.splitlines():
+        if line.strip() == delimiter:
+            pieces.append([])
+        else:
+            pieces[-1].append(line)
+    return ["\n".join(piece) for piece in pieces if any(line.strip() for line in piece)]
+
+
+class ResultCache:
+    """Caches the printed result and final basis of each LP, keyed by a
+    hash of its coefficients and of the options which change the output,
+    so that solving the same LP again only prints the stored result. The
+    final basis is also kept for the structure of the LP, its dimensions
+    and the positions of its nonzeros, and offered as the starting basis
+    of LPs which only differ in the values of the coefficients.
+
+    Entries are kept in memory, and also as JSON files in the directory
+    if one is given, which lasts across runs and is shared by processes.
+    Both hold at most max_entries entries, evicting the least recently
+    used ones."""
+
+    def __init__(self, directory=None, max_entries=1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def keys(objective, constraints, args, stages=()):
+        """Returns the key of the LP and the key of its structure."""
+        exact = lambda value: str(Fraction(value))
+        content = hashlib.sha256()
+        structure = hashlib.sha256()
+        header = f"{len(objective)} {len(constraints)}\n"
+        content.update(header.encode())
+        structure.update(header.encode())
+        content.update(" ".join(map(exact, objective)).encode())
+        for constraint in constraints:
+            items = sorted(row_items(constraint))
+            content.update(("\n" + " ".join(f"{j}:{exact(a)}" for j, a in items)
+                            + f" <= {exact(constraint[-1])}").encode())
+            structure.update(("\n" + " ".join(str(j) for j, _ in items)).encode())
+        options = [args.engine, args.rule, args.presolve, args.scaling, args.sensitivity]
+        if args.crossover:
+            options.append("crossover")
+        if args.crash:
+            options.append("crash")
+        if args.portfolio:
+            options.append(["portfolio", args.portfolio])
+        if getattr(constraints, "upper", None):
+            options.append(sorted((k, exact(bound)) for k, bound in constraints.upper.items()))
+        for stage in stages:
+            options.append([list(map(exact, stage.offsets)), stage.columns, exact(stage.constant)])
+        content.update(("\n" + json.dumps(options)).encode())
+        return content.hexdigest(), "structure-" + structure.hexdigest()
+
+    def get(self, key):
+        """Returns the entry stored under the key, or None."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if self.directory is None:
+            return None
+        path = os.path.join(self.directory, key + ".json")
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            # The modification time orders the files by their last use
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        self.remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """Stores the entry under the key."""
+        self.remember(key, entry)
+        if self.directory is None:
+            return
+        path = os.path.join(self.directory, key + ".json")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(entry, f)
+        os.replace(temporary, path)
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.endswith(".json")]
+        if len(files) > self.max_entries:
+            files.sort(key=lambda name: os.stat(name).st_mtime if os.path.exists(name) else 0)
+            for name in files[:len(files)-self.max_entries]:
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+
+# Caches of this process, one for each directory and size
+RESULT_CACHES = {}
+
+
+def open_cache(args):
+    """Returns the ResultCache chosen on the command line, or None."""
+    if args.cache is None:
+        return None
+    key = (args.cache, args.cache_size)
+    if key not in RESULT_CACHES:
+        RESULT_CACHES[key] = ResultCache(args.cache, args.cache_size)
+    return RESULT_CACHES[key]
+
+
+# The sensitivity analysis and bases refer to the rows and columns of
+# the LP given to the engine, which these stages change
+INPUT_STAGE_ERROR = ("--presolve, --scaling, MPS input and relations or bounds in the text format "
+                     "cannot be combined with --sensitivity, --warm-start or --save-basis")
+
+
+def solve_lp(objective, constraints, args, basis=None, stages=()):
+    """Solves an LP with the engine, pivot rule, presolve and scaling
+    chosen on the command line, starting from the basis if given, and
+    prints the result with its sensitivity analysis if requested. The
+    result is mapped back through the stages the LP was read with, if
+    any. If the result cache is enabled, a cached result is printed
+    instead, and an LP with a cached basis for its structure starts from
+    that basis. With --portfolio, the LP is solved by solve_portfolio().
+    Returns the final dictionary, or None if the LP is infeasible or its
+    result came from the cache. An LP solved in other processes returns
+    the PortfolioResult of solve_portfolio() instead, with only a basis."""
+    if (stages or args.presolve or args.scaling) and (args.sensitivity or basis is not None):
+        raise ValueError(INPUT_STAGE_ERROR)
+    solve_one = solve_portfolio if args.portfolio else solve_uncached
+    cache = open_cache(args)
+    if cache is None:
+        return solve_one(objective, constraints, args, basis, stages)
+    key, structure = cache.keys(objective, constraints, args, stages)
+    entry = cache.get(key)
+    if entry is not None:
+        print(entry["output"], end="")
+        return None
+    # Bases are only exported by dictionaries of the LP as it was read
+    restarts = not stages and not args.presolve and not args.scaling
+    if restarts and basis is None:
+        cached = cache.get(structure)
+        basis = cached["basis"] if cached is not None else None
+    output = io.StringIO()
+    with redirect_stdout(output):
+        final_dictionary = solve_one(objective, constraints, args, basis, stages)
+    print(output.getvalue(), end="")
+    final_basis = None
+    if restarts and final_dictionary is not None:
+        final_basis = [int(v) for v in final_dictionary.basis()]
+        cache.put(structure, {"basis": final_basis})
+    cache.put(key, {"output": output.getvalue(), "basis": final_basis})
+    return final_dictionary
+
+
+def solve_uncached(objective, constraints, args, basis=None, stages=(), stats=None):
+    """Same as solve_lp(), without the result cache. The timings of the
+    phases are stored in stats as by solve(), and those of the crash
+    basis as the crash phase. Every phase and counter is stored, as zero
+    if the LP never reaches it."""
+    stats = {} if stats is None else stats
+    stats.update(crash_time=0.0, crash_pivots=0, phase_one_time=0.0, phase_one_pivots=0, phase_two_time=0.0,
+                 phase_two_pivots=0, report_time=0.0, pivots=0, degenerate_pivots=0, ratio_candidates=0,
+                 denominator_bits=0, bound_flips=0)
+    stages = list(stages)
+    upper = getattr(constraints, "upper", None)
+    if upper and (args.presolve or args.scaling or not ENGINES[args.engine].supports_bounds
+                  or min(upper.values()) < 0):
+        # Only the dictionary engine keeps bounds and ranged rows as they
+        # are, and a negative upper bound, which no value meets, is left
+        # to the rows to prove infeasible
+        constraints = constraints.expand()
+    reduced_objective, reduced_constraints = objective, constraints
+    if args.presolve:
+        stages.append(Presolve(objective, constraints))
+        if stages[-1].infeasible:
+            # No dictionary is built, but the report and trace are made
+            # as for an LP the simplex method proves infeasible
+            clock = time.perf_counter()
+            print("infeasible")
+            record_phase(stats, "report", clock)
+            if args.trace:
+                Trace().write(args.trace, stats)
+            return None
+        reduced_objective, reduced_constraints = stages[-1].reduced()
+        if getattr(reduced_constraints, "upper", None) and \
+                (args.scaling or not ENGINES[args.engine].supports_bounds):
+            reduced_constraints = reduced_constraints.expand()
+    if args.scaling:
+        stages.append(Scaling(reduced_objective, reduced_constraints, args.scaling))
+        reduced_objective, reduced_constraints = stages[-1].reduced()
+    trace = Trace() if args.trace else None
+    input_dictionary = None
+    if len(reduced_objective) or not stages:
+        rule = make_rule(args.engine, args.rule)
+        options = {"crossover": True} if args.crossover else {}
+        input_dictionary = ENGINES[args.engine](reduced_objective, reduced_constraints, rule, **options)
+        if trace is not None:
+            input_dictionary.subscribe(trace)
+        if args.crash and basis is None:
+            clock = time.perf_counter()
+            input_dictionary = input_dictionary.with_basis(crash_basis(reduced_objective, reduced_constraints))
+            record_phase(stats, "crash", clock, input_dictionary)
+    for stage in reversed(stages):
+        input_dictionary = PresolvedDictionary(stage, input_dictionary)
+    if basis is not None:
+        final_dictionary = resolve(input_dictionary, basis)
+    else:
+        final_dictionary = solve(input_dictionary, stats)
+    if trace is not None:
+        # A warm start does not go through solve(), which stores the counters
+        if final_dictionary is not None:
+            stats.update(final_dictionary.counters())
+        trace.write(args.trace, stats)
+    if args.sensitivity and final_dictionary is not None and not final_dictionary.is_unbounded():
+        report_sensitivity(final_dictionary, objective, constraints)
+    return final_dictionary
+
+
+def solve_job(job):
+    """Solves one LP of a batch, which is given as its text or read
+    from its source file if the text is None, with the options of
+    solve_lp(). Returns the source with everything solve_lp() printed,
+    or the error which stopped it."""
+    source, text, args = job
+    output = io.StringIO()
+    with redirect_stdout(output):
+        try:
+            if text is None:
+                with open(source, "rb") as f:
+                    objective, constraints, stages = read_input(f, args, source)
+            else:
+                objective, constraints, stages = read_input(io.BufferedReader(io.BytesIO(text.encode())), args)
+            solve_lp(objective, constraints, args, stages=stages)
+        except Exception as e:
+            print(f"error: {e}")
+    return source, output.getvalue()
+
+
+def solve_batch(jobs, workers=None, chunksize=1, ordered=True):
+    """Solves the jobs of solve_job() in a pool of worker processes,
+    yielding each source and output in the order of the jobs, or as
+    soon as each LP is solved if ordered is False. Jobs are sent to the
+    workers in chunks of the given size. A single worker solves the
+    jobs in this process instead."""
+    if workers == 1:
+        yield from map(solve_job, jobs)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.imap if ordered else pool.imap_unordered
+        yield from results(solve_job, jobs, chunksize)
+
+
+def portfolio_configurations(text):
+    """Parses the configurations of --portfolio, separated by commas.
+    Each is an engine, optionally followed by a pivot rule and by the
+    crash flag, as in sparse:dantzig:crash. Returns a list of the engine,
+    rule and crash of each. Raises ValueError if one is not valid."""
+    configurations = []
+    for item in text.split(","):
+        if not item.strip():
+            raise ValueError("empty configuration in --portfolio")
+        engine, *fields = item.strip().split(":")
+        rule = fields.pop(0) if fields else "bland"
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine {engine!r} in --portfolio")
+        if rule not in RULES[engine]:
+            raise ValueError(f"unknown rule {rule!r} in --portfolio")
+        if any(field != "crash" for field in fields) or (fields and engine == "interior"):
+            raise ValueError(f"invalid configuration {item.strip()!r} in --portfolio")
+        configurations.append((engine, rule, bool(fields)))
+    return configurations
+
+
+class PortfolioResult:
+    """Stands in for the final dictionary of the configuration which won
+    the race of solve_portfolio(), which stayed in its process. Only its
+    basis came back, for the result cache."""
+
+    def __init__(self, basis):
+        self.final_basis = basis
+
+    def basis(self):
+        return self.final_basis
+
+
+def portfolio_job(label, objective, constraints, args, basis, stages, results):
+    """Solves the LP with solve_uncached() in a process started by
+    solve_portfolio(), and puts the label of its configuration, its
+    statistics, everything it printed and its final basis, or the error
+    which stopped it, on the results queue."""
+    stats = {}
+    output = io.StringIO()
+    error = None
+    final_basis = None
+    with redirect_stdout(output):
+        try:
+            final_dictionary = solve_uncached(objective, constraints, args, basis, stages, stats)
+            if final_dictionary is not None:
+                final_basis = [int(v) for v in final_dictionary.basis()]
+        except Exception as e:
+            error = e
+    results.put((label, stats, output.getvalue(), error, final_basis))
+
+
+def solve_portfolio(objective, constraints, args, basis=None, stages=(), stats=None):
+    """Same as solve_uncached(), but races the configurations listed in
+    args.portfolio, each solving the LP in a process of its own. The
+    output of the first to finish without an error is printed, and the
+    other processes are terminated. Its statistics are stored in stats,
+    with the configuration which won as portfolio_winner. Returns a
+    PortfolioResult with its final basis, as the final dictionary stays in
+    its process, or None if it has none. Raises the error of the last
+    configuration if none of them finished."""
+    results = multiprocessing.Queue()
+    processes = []
+    for engine, rule, crash in portfolio_configurations(args.portfolio):
+        options = copy(args)
+        options.engine, options.rule, options.crash = engine, rule, crash
+        options.crossover = args.crossover and engine == "interior"
+        label = f"{engine}:{rule}" + (":crash" if crash else "")
+        process = multiprocessing.Process(target=portfolio_job, daemon=True,
+                                          args=(label, objective, constraints, options, basis, stages, results))
+        process.start()
+        processes.append(process)
+    error = RuntimeError("every configuration of --portfolio stopped without a result")
+    try:
+        for _ in processes:
+            while True:
+                try:
+                    label, job_stats, output, job_error, final_basis = results.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    # A process killed before it put its result never will
+                    if not any(process.is_alive() for process in processes) and results.empty():
+                        raise error
+            if job_error is None:
+                print(output, end="")
+                if stats is not None:
+                    stats.update(job_stats, portfolio_winner=label)
+                return PortfolioResult(final_basis) if final_basis is not None else None
+            error = job_error
+        raise error
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Solves an LP in standard form read from stdin.")
+    parser.add_argument("files", nargs="*",
+                        help="read the LP from this file instead, several files are solved as a batch")
+    parser.add_argument("--format", choices=["auto", "text", "mps", "fixed-mps", "binary"], default="auto",
+                        help="input format, detected from the start of the input by default "
+                             "(fixed MPS is never detected)")
+    parser.add_argument("--convert", metavar="FILE",
+                        help="write the LP to this file in the binary format instead of solving it")
+    parser.add_argument("--engine", choices=ENGINES.keys(), default="dictionary",
+                        help="representation of the dictionary used while pivoting")
+    parser.add_argument("--rule", choices=RULES["dictionary"].keys(), default="bland",
+                        help="pivot rule choosing the entering variable")
+    parser.add_argument("--crossover", action="store_true",
+                        help="move the solution of the interior engine to an optimal vertex")
+    parser.add_argument("--crash", action="store_true",
+                        help="start from a triangular crash basis instead of the slack variables")
+    parser.add_argument("--portfolio", metavar="CONFIGS",
+                        help="race these comma separated configurations, each engine[:rule[:crash]], in "
+                             "parallel processes and print the first result, instead of --engine, "
+                             "--rule and --crash")
+    parser.add_argument("--sensitivity", action="store_true",
+                        help="also print reduced costs, dual values and ranges of an optimal LP")
+    parser.add_argument("--warm-start", metavar="FILE",
+                        help="start from the basis saved in this file by --save-basis")
+    parser.add_argument("--save-basis", metavar="FILE",
+                        help="save the final basis to this file")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="save every pivot and the counters of the solve to this file as JSON")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="cache results in memory and in this directory, and print "
+                             "the cached result of an LP solved before")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="number of results kept in the cache (default: 1024)")
+    parser.add_argument("--presolve", action="store_true",
+                        help="remove redundant rows and columns before solving")
+    parser.add_argument("--scaling", choices=["geometric", "equilibrate"],
+                        help="scale the rows and columns of the LP before solving")
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--delimiter", nargs="?", const="---",
+                       help="solve a stream of LPs from stdin, separated by lines equal to this, "
+                            "or to --- if it is omitted. A delimiter starting with - must be attached "
+                            "with =, as in --delimiter=-----")
+    batch.add_argument("--workers", type=int,
+                       help="number of worker processes (default: number of CPUs)")
+    batch.add_argument("--chunksize", type=int, default=1,
+                       help="number of LPs sent to a worker at a time")
+    batch.add_argument("--unordered", action="store_true",
+                       help="print each result as soon as it is solved")
+    args = parser.parse_args()
+    if (args.presolve or args.scaling or args.format in ("mps", "fixed-mps")) and \
+            (args.sensitivity or args.warm_start or args.save_basis):
+        parser.error(INPUT_STAGE_ERROR)
+
+    if args.portfolio is not None:
+        try:
+            portfolio_configurations(args.portfolio)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.save_basis or args.trace or len(args.files) > 1 or args.delimiter is not None:
+            parser.error("--portfolio cannot be combined with --save-basis, --trace or batch mode, "
+                         "as the LP is solved in other processes")
+    if args.crossover and args.engine != "interior" and not args.portfolio:
+        parser.error("--crossover requires --engine interior")
+    if args.engine == "interior" and args.sensitivity and not args.crossover:
+        parser.error("--sensitivity with --engine interior requires --crossover, "
+                     "as the interior point solution is not a vertex")
+    if args.crash and (args.engine == "interior" or args.warm_start):
+        parser.error("--crash cannot be combined with --engine interior, which does not pivot, "
+                     "or --warm-start, which gives the starting basis")
+
+    if args.cache and (args.save_basis or args.trace):
+        parser.error("--save-basis and --trace cannot be combined with --cache, which may not solve the LP")
+
+    if len(args.files) > 1 or args.delimiter is not None:
+        if args.convert or args.trace:
+            parser.error("--convert and --trace take a single LP")
+        # Batch mode, each report is preceded by the source of its LP
+        if args.files:
+            jobs = [(path, None, args) for path in args.files]
+        else:
+            texts = split_stream(sys.stdin.read(), args.delimiter)
+            jobs = [(f"<stdin>:{i+1}", text, args) for i, text in enumerate(texts)]
+        for source, output in solve_batch(jobs, args.workers, args.chunksize, not args.unordered):
+            print(f"==> {source} <==")
+            print(output, end="", flush=True)
+        return
+
+    # Read encoding of LP from STDIN, or the given file
+    try:
+        if args.files:
+            with open(args.files[0], "rb") as f:
+                objective, constraints, stages = read_input(f, args, args.files[0])
+        else:
+            objective, constraints, stages = read_input(sys.stdin.buffer, args)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.convert:
+        write_binary(args.convert, objective, constraints, stages)
+        return
+    if stages and (args.sensitivity or args.warm_start or args.save_basis):
+        parser.error(INPUT_STAGE_ERROR)
+
+    basis = None
+    if args.warm_start:
+        with open(args.warm_start) as f:
+            basis = [int(v) for v in f.read().split()]
+    final_dictionary = solve_lp(objective, constraints, args, basis, stages)
+    if args.save_basis and final_dictionary is not None:
+        with open(args.save_basis, "w") as f:
+            print(*final_dictionary.basis(), file=f)
 
 
 if __name__ == "__main__":
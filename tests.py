@@ -1,8 +1,531 @@
-from solver import main as solve
+import io
 import os
 import sys
+import json
+import tempfile
 import subprocess
 from time import time
+from contextlib import redirect_stdout
+
+FEATURES = "./test_LPs_features"
+
+ENGINES = ["dictionary", "tableau", "revised", "sparse", "integer", "mixed", "interior"]
+EVERY_ENGINE = [["--engine", engine] for engine in ENGINES]
+PRESOLVE = [["--presolve"] + options for options in EVERY_ENGINE]
+RULES = ["bland", "dantzig", "largest-increase", "steepest-edge", "devex", "partial"]
+
+# Inputs of test_LPs_features, with the options each one is solved with.
+# Every combination must print the expected output of the input.
+FEATURE_TESTS = [
+    ("bounds_postsolve_noise.txt", EVERY_ENGINE + [["--engine", "interior", "--crossover"],
+                                                   ["--engine", "interior", "--presolve"]]),
+    ("bounds_free.txt", EVERY_ENGINE),
+    ("bounds_negative_upper.txt", EVERY_ENGINE),
+    ("bounds_equality.txt", EVERY_ENGINE),
+    ("bounds_infeasible.txt", EVERY_ENGINE),
+    ("bounds_ranged.txt", EVERY_ENGINE),
+    ("bounds_flips.txt", EVERY_ENGINE),
+    ("bounds_unbounded.txt", EVERY_ENGINE),
+    ("no_constraints_unbounded.txt", EVERY_ENGINE),
+    ("no_constraints_optimal.txt", EVERY_ENGINE),
+    # Every point of x_1 + x_2 = 2 is optimal, and the interior point
+    # method stops in the middle of that face without crossover
+    ("dual_start_one_row.txt", EVERY_ENGINE[:-1] + [["--engine", "interior", "--crossover"]]),
+    ("dual_start_two_rows.txt", EVERY_ENGINE),
+    ("mps_free_vanderbei_example2.1.txt", [[], ["--engine", "revised"]]),
+    ("mps_fixed_vanderbei_example2.1.txt", [["--format", "fixed-mps"],
+        ["--format", "fixed-mps", "--engine", "revised"]]),
+    ("mps_free_netlib_afiro.txt", [[], ["--format", "mps"]]),
+    ("mps_fixed_netlib_afiro.txt", [["--format", "fixed-mps"]]),
+    ("binary_exact.txt", [["--engine", "dictionary"], ["--engine", "sparse"]]),
+    ("presolve_empty_row.txt", PRESOLVE + [[]]),
+    ("presolve_empty_row_infeasible.txt", PRESOLVE + [[]]),
+    ("presolve_negative_row.txt", PRESOLVE + [[]]),
+    ("presolve_zero_row.txt", PRESOLVE + [[]]),
+    ("presolve_lower_bound.txt", PRESOLVE + [[]]),
+    ("presolve_upper_bound.txt", PRESOLVE + [[], ["--presolve", "--scaling", "geometric"],
+                                            ["--presolve", "--crash"]]),
+    ("presolve_upper_bound_column.txt", PRESOLVE + [[]]),
+    ("presolve_duplicate_rows.txt", PRESOLVE + [[]]),
+    ("presolve_dominated_column.txt", PRESOLVE + [[]]),
+    # x_3 may take any value from 2 up, and postsolve picks the smallest
+    ("presolve_grow_column.txt", PRESOLVE),
+    ("presolve_unbounded.txt", PRESOLVE + [[]]),
+    ("presolve_infeasible_bounds.txt", PRESOLVE + [[]]),
+    # The interior point method prints sensitivity only after crossover
+    ("sensitivity_vanderbei_example2.1.txt", [["--sensitivity"] + options for options in EVERY_ENGINE[:-1]
+                                              + [["--engine", "interior", "--crossover"]]]),
+]
+
+# Inputs of test_LPs_features in another format than the text format, with
+# the input of test_LPs_volume1 they must print the same output as.
+FORMAT_TESTS = [
+    ("mps_free_vanderbei_example2.1.txt", "vanderbei_example2.1.txt", []),
+    ("mps_fixed_vanderbei_example2.1.txt", "vanderbei_example2.1.txt", ["--format", "fixed-mps"]),
+    ("mps_free_netlib_afiro.txt", "netlib_afiro.txt", []),
+    ("mps_fixed_netlib_afiro.txt", "netlib_afiro.txt", ["--format", "fixed-mps"]),
+]
+
+
+def run(arguments, stdin=None, timeout=5):
+    """Runs the solver with the given arguments, and returns the lines of
+    its output without trailing blank lines, or None on a timeout."""
+    try:
+        completed = subprocess.run(["python", "solver.py"] + arguments,
+            input=stdin, stdout=subprocess.PIPE, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    output = completed.stdout.decode("utf-8").split("\n")
+    while output and not output[-1].strip():
+        output.pop()
+    return [line.rstrip() for line in output]
+
+
+def read_answer(path):
+    with open(path, "r") as f:
+        return [x.rstrip() for x in f.readlines() if len(x.rstrip()) > 0]
+
+
+def check(name, output, answer):
+    """Prints whether output matches answer, and returns whether it does.
+    An output of None, from a run which timed out, never matches."""
+    if output is not None and output == answer:
+        return True
+    print(f"Incorrect: {name}")
+    print(f"Output:\n{output}")
+    print(f"Answer:\n{answer}")
+    return False
+
+
+def feature(filename):
+    """Returns the path of an input of test_LPs_features."""
+    return os.path.join(FEATURES, "input", filename)
+
+
+def expected(filename):
+    """Returns the expected output of an input of test_LPs_features."""
+    return read_answer(os.path.join(FEATURES, "output", filename))
+
+
+def trace(arguments):
+    """Runs the solver with --trace, and returns its output and the
+    trace it saved."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.json")
+        output = run(["--trace", path] + arguments)
+        with open(path, "r") as f:
+            return output, json.load(f)
+
+
+def check_bound_flips():
+    # Every variable ends at its upper bound without a single pivot
+    output, record = trace([feature("bounds_flips.txt")])
+    stats = record["stats"]
+    return [check("--trace bounds_flips.txt", output, expected("bounds_flips.txt")),
+            check("bound flips of bounds_flips.txt", (stats["bound_flips"], stats["pivots"]), (3, 0))]
+
+
+def check_binary():
+    # Each LP converted to the binary format prints what its original does,
+    # from a path given the format or detected, and detected from stdin
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        converted = os.path.join(directory, "lp.lpb")
+        # The dictionary engine takes minutes on klein2, and only needs the exact values
+        for path, options in [(feature("binary_exact.txt"), []), (feature("bounds_ranged.txt"), []),
+                              (feature("mps_free_netlib_afiro.txt"), []),
+                              ("./data/input/netlib_klein2.txt", ["--engine", "revised"])]:
+            answer = run(options + [path], timeout=30)
+            subprocess.run(["python", "solver.py", "--convert", converted, path], check=True)
+            with open(converted, "rb") as f:
+                stdin = f.read()
+            name = os.path.basename(path)
+            results.append(check("binary " + name, run(options + [converted], timeout=30), answer))
+            results.append(check("--format binary " + name,
+                                 run(options + ["--format", "binary", converted], timeout=30), answer))
+            results.append(check("binary stdin " + name, run(options, stdin, timeout=30), answer))
+        # Decimal values are not stored twice, so the file is smaller than the text
+        results.append(check("size of binary netlib_klein2.txt",
+                             os.path.getsize(converted) < os.path.getsize("./data/input/netlib_klein2.txt"), True))
+    return results
+
+
+def cache_entries(directory):
+    """Returns the result entries of a --cache directory by file name,
+    leaving out the bases kept for the structure of each LP."""
+    entries = {}
+    for name in os.listdir(directory):
+        if name.endswith(".json") and not name.startswith("structure-"):
+            with open(os.path.join(directory, name), "r") as f:
+                entries[name] = json.load(f)
+    return entries
+
+
+def mark_cache_entries(directory):
+    # A result printed from the cache now shows up as "cached"
+    for name, entry in cache_entries(directory).items():
+        entry["output"] = "cached\n"
+        with open(os.path.join(directory, name), "w") as f:
+            json.dump(entry, f)
+
+
+def check_cache():
+    results = []
+    first, second = "./data/input/optimal_3x3_1.txt", "./data/input/optimal_3x3_2.txt"
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ["--cache", directory]
+        answer = read_answer("./data/output/optimal_3x3_1.txt")
+        results.append(check("--cache miss", run(cache + [first]), answer))
+        results.append(check("--cache entries", len(cache_entries(directory)), 1))
+        mark_cache_entries(directory)
+        results.append(check("--cache hit", run(cache + [first]), ["cached"]))
+        # Options which change the output are part of the key
+        results.append(check("--cache miss on --engine", run(cache + ["--engine", "revised", first]), answer))
+        results.append(check("--cache hit on --engine", run(cache + ["--engine", "revised", first]), answer))
+        results.append(check("--cache entries after --engine", len(cache_entries(directory)), 2))
+    with tempfile.TemporaryDirectory() as directory:
+        # Each LP takes two entries, its result and the basis of its structure
+        run(["--cache", directory, first])
+        mark_cache_entries(directory)
+        run(["--cache", directory, "--cache-size", "4", second])
+        results.append(check("--cache-size 4 keeps", run(["--cache", directory, first]), ["cached"]))
+        run(["--cache", directory, "--cache-size", "2", second, "--engine", "revised"])
+        results.append(check("--cache-size 2 evicts", run(["--cache", directory, first]),
+                             read_answer("./data/output/optimal_3x3_1.txt")))
+    with tempfile.TemporaryDirectory() as directory:
+        # The basis of the configuration which won comes back from its process
+        path = "./test_LPs_volume1/input/vanderbei_example2.1.txt"
+        output = run(["--cache", directory, "--portfolio", "dictionary,revised", path])
+        results.append(check("--cache --portfolio", output, read_answer("./test_LPs_volume1/output/vanderbei_example2.1.txt")))
+        bases = [entry["basis"] for entry in cache_entries(directory).values()]
+        results.append(check("--cache --portfolio basis", [sorted(basis) for basis in bases], [[0, 2, 5]]))
+    return results
+
+
+def batch_blocks(output):
+    """Splits the output of batch mode into the source and output of each LP."""
+    blocks = []
+    for line in output or []:
+        if line.startswith("==> ") and line.endswith(" <=="):
+            blocks.append((line[4:-4], []))
+        elif line.strip():
+            blocks[-1][1].append(line)
+    return blocks
+
+
+def check_batch():
+    results = []
+    names = ["optimal_3x3_1.txt", "infeasible_3x3_1.txt", "unbounded_3x3_1.txt",
+             "optimal_10x7_1.txt", "445k22_A1_juice.txt"]
+    paths = ["./data/input/" + name for name in names]
+    answers = [read_answer("./data/output/" + name) for name in names]
+    expected_files = list(zip(paths, answers))
+    for options in [[], ["--workers", "1"], ["--workers", "2", "--chunksize", "2"]]:
+        output = run(options + paths, timeout=30)
+        results.append(check(" ".join(["batch"] + options), batch_blocks(output), expected_files))
+    output = run(["--workers", "2", "--unordered"] + paths, timeout=30)
+    results.append(check("batch --unordered", sorted(batch_blocks(output)), sorted(expected_files)))
+
+    texts = []
+    for path in paths:
+        with open(path, "r") as f:
+            texts.append(f.read())
+    expected_stdin = [(f"<stdin>:{i+1}", answer) for i, answer in enumerate(answers)]
+    for delimiter, options in [("---", ["--delimiter"]), ("---", ["--delimiter=---", "--workers", "2"]),
+                               ("next", ["--delimiter", "next", "--chunksize", "3"])]:
+        stdin = ("\n" + delimiter + "\n").join(texts).encode()
+        output = run(options, stdin, timeout=30)
+        results.append(check(" ".join(["batch"] + options), batch_blocks(output), expected_stdin))
+    return results
+
+
+def errors(arguments):
+    """Runs the solver, and returns its exit status and the last line it
+    printed to stderr."""
+    completed = subprocess.run(["python", "solver.py"] + arguments, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, timeout=30)
+    lines = completed.stderr.decode("utf-8").strip().split("\n")
+    return completed.returncode, lines[-1]
+
+
+def check_portfolio():
+    import multiprocessing
+    from argparse import Namespace
+    from solver import read_lp, solve_portfolio
+    results = []
+    path = "./data/input/optimal_3x3_1.txt"
+    for configs, message in [("simplex", "unknown engine 'simplex' in --portfolio"),
+                             ("sparse:fastest", "unknown rule 'fastest' in --portfolio"),
+                             ("interior:bland:crash", "invalid configuration 'interior:bland:crash' in --portfolio"),
+                             ("", "empty configuration in --portfolio"),
+                             ("revised,", "empty configuration in --portfolio")]:
+        results.append(check(f"--portfolio {configs!r}", errors(["--portfolio", configs, path]),
+                             (2, "solver.py: error: " + message)))
+
+    with open("./data/input/netlib_klein2.txt", "r") as f:
+        objective, constraints = read_lp(f.read())
+    args = Namespace(engine="dictionary", rule="bland", crash=False, crossover=False, presolve=False,
+                     scaling=None, sensitivity=False, trace=None, portfolio="dictionary,revised:dantzig")
+    # The dictionary engine takes minutes on klein2, and is stopped as soon as revised is done
+    stats = {}
+    start = time()
+    output = io.StringIO()
+    with redirect_stdout(output):
+        solve_portfolio(objective, constraints, args, stats=stats)
+    results.append(check("--portfolio klein2", output.getvalue(), "infeasible\n"))
+    results.append(check("--portfolio winner", stats.get("portfolio_winner"), "revised:dantzig"))
+    results.append(check("--portfolio stops the others", (time() - start < 60, multiprocessing.active_children()),
+                         (True, [])))
+
+    # Every configuration fails on constraints which are not a list
+    try:
+        with redirect_stdout(io.StringIO()):
+            solve_portfolio(objective, None, args)
+        error = None
+    except TypeError as e:
+        error = e
+    results.append(check("--portfolio every configuration fails", type(error), TypeError))
+    results.append(check("--portfolio stops after failures", multiprocessing.active_children(), []))
+    return results
+
+
+# The LPs of data/input which every engine solves in a moment
+SMALL_LPS = sorted("./data/input/" + name for name in os.listdir("./data/input")
+                   if not name.startswith("netlib_"))
+
+
+# Inputs of test_LPs_volume1 and test_LPs_volume2 with an expected output,
+# besides the netlib LPs
+VOLUME_LPS = sorted(os.path.join(directory, "input", name) for directory in ["./test_LPs_volume1", "./test_LPs_volume2"]
+                    for name in os.listdir(os.path.join(directory, "input"))
+                    if not name.startswith("netlib_") and os.path.exists(os.path.join(directory, "output", name)))
+
+
+def answer_of(path):
+    return read_answer(path.replace("/input/", "/output/"))
+
+
+def solve_all(options, paths, timeout=120):
+    """Solves the LPs in batch mode, and returns the output of each by path."""
+    return dict(batch_blocks(run(options + paths, timeout=timeout)))
+
+
+def check_interior():
+    # The interior point solution may lie inside the optimal face, and
+    # crossover moves it to the vertex the simplex method prints
+    results = []
+    outputs = solve_all(["--engine", "interior"], SMALL_LPS)
+    results.extend(check("--engine interior " + path, outputs.get(path, [])[:2], answer_of(path)[:2])
+                   for path in SMALL_LPS)
+    outputs = solve_all(["--engine", "interior", "--crossover"], SMALL_LPS)
+    results.extend(check("--engine interior --crossover " + path, outputs.get(path), answer_of(path))
+                   for path in SMALL_LPS)
+    return results
+
+
+def check_rules():
+    # Every engine reaches the optimal value with every rule, though a
+    # rule may stop at another optimal vertex
+    results = []
+    for engine in ENGINES:
+        for rule in RULES:
+            options = ["--engine", engine, "--rule", rule]
+            outputs = solve_all(options, SMALL_LPS)
+            results.extend(check(" ".join(options + [path]), outputs.get(path, [])[:2], answer_of(path)[:2])
+                           for path in SMALL_LPS)
+    return results
+
+
+def check_trace():
+    # The trace holds one record per pivot, in order, ending at the
+    # printed optimal value
+    path = os.path.join("./test_LPs_volume1/input", "vanderbei_example2.1.txt")
+    results = []
+    for engine in ENGINES[:-1]:
+        output, record = trace(["--engine", engine, path])
+        stats, pivots = record["stats"], record["pivots"]
+        elapsed = [pivot["elapsed"] for pivot in pivots]
+        results.append(check("--trace --engine {} {}".format(engine, path), output, answer_of(path)))
+        results.append(check("pivots of --trace --engine " + engine, len(pivots), stats["pivots"]))
+        results.append(check("records of --trace --engine " + engine,
+                             [sorted(pivot) for pivot in pivots],
+                             [["elapsed", "entering", "leaving", "objective"]] * len(pivots)))
+        results.append(check("elapsed of --trace --engine " + engine, elapsed, sorted(elapsed)))
+        results.append(check("objective of --trace --engine " + engine,
+                             pivots and "{:.7g}".format(pivots[-1]["objective"]), output[1]))
+    return results
+
+
+def check_warm_start():
+    # Starting from the optimal basis takes no pivot, and starting from it
+    # after the right hand side changed prints what a cold start does
+    path = os.path.join("./test_LPs_volume1/input", "vanderbei_example2.1.txt")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        basis = os.path.join(directory, "basis.txt")
+        changed = os.path.join(directory, "changed.txt")
+        with open(path, "r") as f:
+            lines = f.read().split("\n")
+        lines[1] = lines[1].rsplit(None, 1)[0] + " 6"
+        with open(changed, "w") as f:
+            f.write("\n".join(lines))
+        for engine in ENGINES[:-1]:
+            options = ["--engine", engine]
+            results.append(check("--save-basis " + " ".join(options),
+                                 run(options + ["--save-basis", basis, path]), answer_of(path)))
+            output, record = trace(options + ["--warm-start", basis, path])
+            results.append(check("--warm-start " + " ".join(options), output, answer_of(path)))
+            if engine in ("tableau", "revised"):
+                results.append(check("pivots of --warm-start " + " ".join(options),
+                                     record["stats"]["pivots"], 0))
+            results.append(check("--warm-start {} with another right hand side".format(" ".join(options)),
+                                 run(options + ["--warm-start", basis, changed]), run(options + [changed])))
+
+    # With x_1 <= 3, the basis of x_1 optimal for a right hand side of 2
+    # leaves x_1 above its upper bound once the right hand side is 4,
+    # which the dual simplex method resolves from there
+    from solver import SimplexDictionary, blands_rule, read_text, resolve
+    objective, constraints, _ = read_text("2 1\n1 1 <= 4\nupper 3 inf\n")
+    output = io.StringIO()
+    with redirect_stdout(output):
+        resolve(SimplexDictionary(objective, constraints, blands_rule), [0])
+    results.append(check("resolve() above an upper bound", output.getvalue().split("\n"),
+                         ["optimal", "7", "3 1", ""]))
+    return results
+
+
+def check_presolve_trace():
+    # An LP presolve proves infeasible is traced with the statistics of
+    # one the simplex method proves infeasible
+    output, record = trace(["--presolve", feature("presolve_infeasible_bounds.txt")])
+    _, solved = trace([feature("presolve_infeasible_bounds.txt")])
+    return [check("--presolve --trace presolve_infeasible_bounds.txt", output,
+                  expected("presolve_infeasible_bounds.txt")),
+            check("trace of --presolve presolve_infeasible_bounds.txt", (sorted(record["stats"]), record["pivots"]),
+                  (sorted(solved["stats"]), []))]
+
+
+def check_scaling():
+    # Scaling leaves the output unchanged, but for LPs with several optimal
+    # vertices the engine may stop at another one whatever the scaling
+    results = []
+    for engine in ["dictionary", "revised"]:
+        unscaled = solve_all(["--engine", engine], VOLUME_LPS)
+        for scaling in ["geometric", "equilibrate"]:
+            options = ["--engine", engine, "--scaling", scaling]
+            outputs = solve_all(options, VOLUME_LPS)
+            for path in VOLUME_LPS:
+                lines = None if unscaled.get(path) == answer_of(path) else 2
+                results.append(check(" ".join(options + [path]), (outputs.get(path) or [])[:lines],
+                                     answer_of(path)[:lines]))
+    return results
+
+
+def check_read_lp():
+    # A constraint with the wrong number of coefficients is an error for
+    # both parses, and the float parse rounds the values of the exact one
+    from solver import read_lp
+    results = []
+    for exact in [True, False]:
+        try:
+            read_lp("1 2\n1 2 3\n1 2\n", exact)
+            message = None
+        except ValueError as e:
+            message = str(e)
+        results.append(check(f"read_lp(exact={exact}) of a short constraint", message,
+                             "constraint 2 has 2 coefficients, expected 3"))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "long.txt")
+        with open(path, "w") as f:
+            f.write("1 2\n1 2 3\n1 2 3 4\n")
+        for engine in ["dictionary", "revised"]:
+            results.append(check(f"--engine {engine} of a long constraint", errors(["--engine", engine, path]),
+                                 (2, "solver.py: error: constraint 2 has 4 coefficients, expected 3")))
+    with open("./data/input/netlib_share2b.txt", "r") as f:
+        text = f.read()
+    objective, constraints = read_lp(text)
+    approximate_objective, approximate_constraints = read_lp(text, exact=False)
+    results.append(check("read_lp(exact=False) of netlib_share2b.txt",
+                         (approximate_objective.tolist(), approximate_constraints.tolist()),
+                         ([float(value) for value in objective],
+                          [[float(value) for value in row] for row in constraints])))
+    return results
+
+
+def check_dual_start():
+    # LPs infeasible at the origin with an optimal objective function are
+    # solved by the dual simplex method alone, without the auxiliary LP
+    # and its variable omega, whose id is the number of variables
+    results = []
+    for filename in ["dual_start_one_row.txt", "dual_start_two_rows.txt"]:
+        with open(feature(filename), "r") as f:
+            n = len(f.readline().split())
+        for engine in ENGINES[:-1]:
+            output, record = trace(["--engine", engine, feature(filename)])
+            stats = record["stats"]
+            omega = [pivot for pivot in record["pivots"] if n in (pivot["entering"], pivot["leaving"])]
+            results.append(check(f"--trace --engine {engine} {filename}", output, expected(filename)))
+            results.append(check(f"dual simplex start of --engine {engine} {filename}",
+                                 (stats["phase_one_pivots"] > 0, stats["phase_two_pivots"], omega), (True, 0, [])))
+    return results
+
+
+def check_crash():
+    # The crash basis changes the path of phase one, as the LP may then be
+    # feasible, dual feasible or neither, but not the solution printed
+    results = []
+    for engine in ["dictionary", "revised", "sparse"]:
+        options = ["--engine", engine, "--crash"]
+        outputs = solve_all(options, SMALL_LPS)
+        results.extend(check(" ".join(options + [path]), outputs.get(path), answer_of(path)) for path in SMALL_LPS)
+    return results
+
+
+def check_benchmark():
+    # The test directories are found from any working directory, and a
+    # pattern matches a file name without its extension
+    benchmark = os.path.abspath("benchmark.py")
+    with tempfile.TemporaryDirectory() as directory:
+        completed = subprocess.run(["python", benchmark, "--repeat", "1", "--no-memory", "optimal_3x3_1"],
+                                   stdout=subprocess.PIPE, cwd=directory, timeout=60)
+    names = [line.split()[0] for line in completed.stdout.decode("utf-8").split("\n")[1:] if line.strip()]
+    results = [check("benchmark.py optimal_3x3_1", names,
+                     ["data/optimal_3x3_1.txt", "test_LPs_volume2/optimal_3x3_1.txt"])]
+    # Every phase is reported for the LPs presolve proves infeasible, with
+    # no mark of a difference from the expected output after the memory
+    completed = subprocess.run(["python", benchmark, "--presolve", "--repeat", "1", "--no-memory", "infeasible_*"],
+                               stdout=subprocess.PIPE, timeout=120)
+    lines = [line.split() for line in completed.stdout.decode("utf-8").split("\n")[1:] if line.strip()]
+    results.append(check("benchmark.py --presolve infeasible_*", (completed.returncode, len(lines) > 0),
+                         (0, True)))
+    results.extend(check("benchmark.py --presolve " + line[0], line[1:2] + line[8:], ["infeasible", "-"])
+                   for line in lines)
+    return results
+
+
+# Checks which do more than compare the output of one run, each returning
+# the results of check()
+CHECKS = [check_bound_flips, check_dual_start, check_binary, check_cache, check_batch, check_portfolio,
+          check_interior, check_read_lp, check_rules, check_trace, check_warm_start, check_presolve_trace,
+          check_scaling, check_crash, check_benchmark]
+
+
+def features():
+    """Solves the inputs of test_LPs_features with the options listed in
+    FEATURE_TESTS and FORMAT_TESTS, runs the CHECKS, and returns the
+    number of correct and incorrect results."""
+    results = []
+    for filename, runs in FEATURE_TESTS:
+        for options in runs:
+            name = " ".join(options + [filename])
+            results.append(check(name, run(options + [feature(filename)]), expected(filename)))
+    for filename, text, options in FORMAT_TESTS:
+        answer = run([os.path.join("./test_LPs_volume1/input", text)])
+        results.append(check(" ".join(options + [filename]), run(options + [feature(filename)]), answer))
+    for function in CHECKS:
+        results.extend(function())
+    return results.count(True), results.count(False)
+
 
 def main():
     correct = 0
@@ -47,15 +570,21 @@ def main():
             print("Initially infeasible")
             incorrect += 1
             wrong_but_initially_infeasible += 1
-        else: 
+        else:
             print("Incorrect")
             if len(filenames) == 1:
                 print(f"Output:/n{output}")
                 print(f"Answer:/n{answer}")
             incorrect += 1
 
-    print("\n\n{} correct, {} incorrect, {} timed out".format(correct, incorrect - timedout, timedout)) 
+    print("\n\n{} correct, {} incorrect, {} timed out".format(correct, incorrect - timedout, timedout))
+
+    print("\nDoing feature tests")
+    passed, failed = features()
+    print("{} correct, {} incorrect".format(passed, failed))
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()